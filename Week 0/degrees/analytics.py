@@ -0,0 +1,168 @@
+"""
+Separation statistics of a whole degrees graph.
+
+A level-synchronous breadth-first search over the person <-> movie relation
+of the compact store counts how many people are at each degree of separation
+from a source, level by level, without keeping any paths. Running it from a
+random sample of sources, across a pool of processes, estimates the average
+separation and the diameter of the graph.
+
+    python analytics.py histogram large "Kevin Bacon"
+    python analytics.py sample large --sources 64 --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import degrees
+from graph import levels
+
+
+def separation(source):
+    """
+    Returns the number of people at each degree of separation from source
+    in degrees.graph, with the links scanned, the time it took and one of
+    the farthest people.
+    """
+    start = time.perf_counter()
+    counts = []
+    edges = 0
+    for frontier, scanned in levels(degrees.graph, source):
+        counts.append(len(frontier))
+        edges += scanned
+    return {
+        "source": source,
+        "counts": counts,
+        "edges": edges,
+        "seconds": time.perf_counter() - start,
+        "farthest": frontier[0]
+    }
+
+
+def sample(sources, workers=1):
+    """
+    Returns the separation of every source, see separation,
+    computed by workers processes.
+    """
+    if workers <= 1:
+        return [separation(source) for source in sources]
+
+    # Forked workers inherit the loaded graph instead of receiving a pickled copy
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        return list(pool.imap_unordered(separation, sources))
+
+
+def summarize(results, people):
+    """
+    Combines the separations from sampled sources into the histogram of
+    separations over every pair they were in, the average separation of
+    connected pairs, and a lower bound of the diameter of the graph.
+    """
+    histogram = []
+    for result in results:
+        for distance, count in enumerate(result["counts"]):
+            if distance == len(histogram):
+                histogram.append(0)
+            histogram[distance] += count
+    # A source at distance 0 of itself is not a pair
+    histogram[0] -= len(results)
+
+    connected = sum(histogram)
+    total = len(results) * (people - 1)
+    eccentricities = [len(result["counts"]) - 1 for result in results]
+    return {
+        "sources": len(results),
+        "histogram": histogram,
+        "average_separation": (sum(d * count for d, count in enumerate(histogram))
+                               / connected if connected else None),
+        "connected_fraction": connected / total if total else None,
+        # The eccentricity of any person is a lower bound of the diameter
+        "diameter_lower_bound": max(eccentricities),
+        "edges": sum(result["edges"] for result in results)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    histogram = commands.add_parser(
+        "histogram", help="people at each degree of separation from one person")
+    histogram.add_argument("directory")
+    histogram.add_argument("name", help="name or person_id of the source")
+    sampling = commands.add_parser(
+        "sample", help="estimate average separation and diameter from random sources")
+    sampling.add_argument("directory")
+    sampling.add_argument("--sources", type=int, default=32)
+    sampling.add_argument("--workers", type=int, default=os.cpu_count())
+    sampling.add_argument("--seed", type=int, default=50)
+    sampling.add_argument("--json", action="store_true",
+                          help="print the summary as JSON")
+    args = parser.parse_args()
+
+    degrees.load_data(args.directory, compact=True)
+    graph = degrees.graph
+
+    if args.command == "histogram":
+        person_ids = degrees.person_ids_for_name(args.name)
+        if len(person_ids) != 1:
+            sys.exit(f"{len(person_ids)} people match {args.name}: "
+                     f"{', '.join(sorted(person_ids)) or 'none'}")
+        source = graph.person_index(person_ids[0])
+
+        # Levels are printed as soon as they are found
+        start = time.perf_counter()
+        reached = 0
+        edges = 0
+        for distance, (frontier, scanned) in enumerate(levels(graph, source)):
+            reached += len(frontier)
+            edges += scanned
+            print(f"{distance:3} degrees: {len(frontier):10} people, "
+                  f"{reached / len(graph.person_ids):7.2%} reached", flush=True)
+        elapsed = time.perf_counter() - start
+        print(f"Scanned {edges} links in {elapsed:.2f}s, "
+              f"{edges / elapsed:,.0f} links/s.")
+        return
+
+    rng = random.Random(args.seed)
+    people = len(graph.person_ids)
+    sources = [rng.randrange(people) for _ in range(args.sources)]
+
+    start = time.perf_counter()
+    results = sample(sources, args.workers)
+
+    # Searching again from the farthest person of the source reaching the most
+    # people, the double sweep, usually lands on the true diameter
+    widest = max(results, key=lambda result: sum(result["counts"]))
+    sweep = separation(widest["farthest"])
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(results, people)
+    summary["diameter_lower_bound"] = max(summary["diameter_lower_bound"],
+                                          len(sweep["counts"]) - 1)
+    summary["edges"] += sweep["edges"]
+    summary["seconds"] = elapsed
+    summary["edges_per_second"] = summary["edges"] / elapsed
+    summary["workers"] = args.workers
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"{summary['sources']} sources, {args.workers} workers, {elapsed:.2f}s, "
+          f"{summary['edges_per_second']:,.0f} links/s")
+    for distance, count in enumerate(summary["histogram"]):
+        if distance > 0:
+            print(f"{distance:3} degrees: {count:12} pairs")
+    if summary["average_separation"] is not None:
+        print(f"Average separation: {summary['average_separation']:.2f}")
+        print(f"Connected pairs: {summary['connected_fraction']:.2%}")
+    print(f"Diameter: at least {summary['diameter_lower_bound']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""
+Benchmarks for degrees.py on synthetic data.
+
+    python generate.py synthetic --stars 1000000
+    python benchmark.py run synthetic --output before.json
+    python benchmark.py run synthetic --output after.json
+    python benchmark.py compare before.json after.json
+"""
+import argparse
+import gc
+import json
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import degrees
+import util
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser(
+        "run", help="load time, peak memory and query latency on a directory")
+    run.add_argument("directory")
+    run.add_argument("--queries", type=int, default=1000,
+                     help="number of random pairs to search")
+    run.add_argument("--dict", action="store_true",
+                     help="benchmark the dict store instead of the compact one")
+    run.add_argument("--seed", type=int, default=50)
+    run.add_argument("--output", help="write the JSON results here, not stdout")
+
+    compare = commands.add_parser(
+        "compare", help="compare the results of two runs")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.1,
+                         help="relative slowdown reported as a regression")
+
+    search = commands.add_parser(
+        "search", help="per-query latency of shortest_path")
+    search.add_argument("--stars", type=int, default=1_000_000,
+                        help="number of stars rows to generate")
+    search.add_argument("--queries", type=int, default=200,
+                        help="number of random pairs for the new search")
+    search.add_argument("--baseline-queries", type=int, default=5,
+                        help="number of close pairs for the old movie scan")
+    search.add_argument("--baseline-max-degrees", type=int, default=2,
+                        help="longest separation of the close pairs")
+    search.add_argument("--seed", type=int, default=50)
+
+    memory = commands.add_parser(
+        "memory", help="memory held by the dict and compact stores")
+    memory.add_argument("directory", nargs="?", default="large")
+
+    frontier = commands.add_parser(
+        "frontier", help="push, pop and contains_state of the frontiers")
+    frontier.add_argument("--size", type=int, default=1_000_000,
+                          help="number of nodes pushed into each frontier")
+    frontier.add_argument("--legacy-size", type=int, default=20_000,
+                          help="number of nodes for the old list frontiers")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        results = benchmark_run(args.directory, args.queries,
+                                not args.dict, args.seed)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+            print()
+    elif args.command == "compare":
+        if compare_runs(args.old, args.new, args.threshold):
+            sys.exit(1)
+    elif args.command == "search":
+        benchmark_search(args)
+    elif args.command == "memory":
+        benchmark_memory(args.directory)
+    else:
+        benchmark_frontier(args.size, args.legacy_size)
+
+
+def benchmark_run(directory, queries, compact, seed):
+    """
+    Returns load times, peak memory and latency distributions
+    of the query functions over directory, ready for JSON.
+    """
+    results = {
+        "commit": git_commit(),
+        "directory": directory,
+        "store": "compact" if compact else "dict",
+        "python": sys.version.split()[0],
+        "load": {}
+    }
+
+    start = time.perf_counter()
+    degrees.load_data(directory, compact, cache=False)
+    results["load"]["csv_seconds"] = time.perf_counter() - start
+    if compact:
+        # Once to make sure the snapshot exists, then timed from the snapshot
+        degrees.load_data(directory, compact)
+        start = time.perf_counter()
+        degrees.load_data(directory, compact)
+        results["load"]["snapshot_seconds"] = time.perf_counter() - start
+
+    person_ids = list(degrees.people)
+    results["rows"] = {"people": len(person_ids), "movies": len(degrees.movies)}
+
+    rng = random.Random(seed)
+    lookups = []
+    for _ in range(queries):
+        name = degrees.people[rng.choice(person_ids)]["name"]
+        start = time.perf_counter()
+        degrees.person_ids_for_name(name)
+        lookups.append(time.perf_counter() - start)
+
+    # Prefixes and misspellings of the names of random people
+    prefixes = []
+    fuzzy = []
+    for _ in range(queries):
+        name = degrees.people[rng.choice(person_ids)]["name"]
+        start = time.perf_counter()
+        degrees.name_index.prefix(name[:max(1, len(name) // 2)])
+        prefixes.append(time.perf_counter() - start)
+
+        i = rng.randrange(len(name))
+        start = time.perf_counter()
+        degrees.name_index.fuzzy(name[:i] + name[i + 1:])
+        fuzzy.append(time.perf_counter() - start)
+
+    connected = []
+    unconnected = []
+    lengths = {}
+    for _ in range(queries):
+        source, target = rng.choice(person_ids), rng.choice(person_ids)
+        start = time.perf_counter()
+        path = degrees.shortest_path(source, target)
+        elapsed = time.perf_counter() - start
+        if path is None:
+            unconnected.append(elapsed)
+        else:
+            connected.append(elapsed)
+            lengths[len(path)] = lengths.get(len(path), 0) + 1
+
+    results["person_ids_for_name"] = latency_summary(lookups)
+    results["name_prefix"] = latency_summary(prefixes)
+    results["name_fuzzy"] = latency_summary(fuzzy)
+    results["shortest_path"] = {
+        "connected": latency_summary(connected),
+        "unconnected": latency_summary(unconnected),
+        "degrees": {str(k): lengths[k] for k in sorted(lengths)}
+    }
+
+    # ru_maxrss is in KiB on Linux
+    results["peak_rss_mib"] = resource.getrusage(
+        resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def latency_summary(timings):
+    """
+    Returns the count, mean and percentiles of timings, in milliseconds.
+    """
+    if not timings:
+        return {"count": 0}
+    timings = sorted(timings)
+
+    def percentile(p):
+        return timings[min(len(timings) - 1, int(p / 100 * len(timings)))] * 1000
+
+    return {
+        "count": len(timings),
+        "mean_ms": statistics.mean(timings) * 1000,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": timings[-1] * 1000
+    }
+
+
+def git_commit():
+    """
+    Returns the commit being benchmarked, or None outside of git.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_runs(old_path, new_path, threshold):
+    """
+    Prints every timing and memory figure of two runs side by side.
+
+    Returns True if any got worse by more than threshold.
+    """
+    with open(old_path) as f:
+        old = flatten(json.load(f))
+    with open(new_path) as f:
+        new = flatten(json.load(f))
+
+    regressed = False
+    for key in old:
+        if key not in new or not key.endswith(("_ms", "_seconds", "_mib")):
+            continue
+        before, after = old[key], new[key]
+        change = (after - before) / before if before else 0
+        flag = ""
+        if change > threshold:
+            flag = "  <- regression"
+            regressed = True
+        print(f"{key}: {before:.3f} -> {after:.3f} ({change:+.1%}){flag}")
+    return regressed
+
+
+def flatten(results, prefix=""):
+    """
+    Returns the numbers of nested results keyed by their dotted path.
+    """
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def benchmark_search(args):
+    """
+    Compares the search latency of the bidirectional search
+    with the original movie scan.
+    """
+    print(f"Generating graph with {args.stars} stars rows...")
+    start = time.perf_counter()
+    build_graph(args.stars, args.seed)
+    print(f"Generated {len(degrees.people)} people and {len(degrees.movies)} "
+          f"movies in {time.perf_counter() - start:.2f}s.")
+
+    rng = random.Random(args.seed)
+    person_ids = list(degrees.people)
+    pairs = [(rng.choice(person_ids), rng.choice(person_ids))
+             for _ in range(args.queries)]
+    report("bidirectional", degrees.shortest_path, pairs)
+
+    # The old scan touches every movie per person it expands, so it only
+    # finishes in reasonable time on close pairs; both run on the same ones
+    close = []
+    while len(close) < args.baseline_queries:
+        source, target = rng.choice(person_ids), rng.choice(person_ids)
+        path = degrees.shortest_path(source, target)
+        if path is not None and len(path) <= args.baseline_max_degrees:
+            close.append((source, target))
+    report("bidirectional (close pairs)", degrees.shortest_path, close)
+    report("movie scan (close pairs)", scan_shortest_path, close,
+           check=degrees.shortest_path)
+
+
+def benchmark_memory(directory):
+    """
+    Loads the directory into each store and reports the memory it holds.
+
+    The compact store is measured built from the CSV files, and then
+    memory-mapped from the snapshot, whose pages belong to the file and
+    are not counted as held.
+    """
+    stores = [("dict", False, False), ("compact", True, False),
+              ("compact, mapped", True, True)]
+    for label, compact, cache in stores:
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        degrees.load_data(directory, compact, cache)
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"{label}: {current / 2 ** 20:.1f} MiB held, "
+              f"{peak / 2 ** 20:.1f} MiB peak while loading, "
+              f"loaded in {elapsed:.2f}s")
+        if compact:
+            print(f"    columns of the graph: "
+                  f"{degrees.graph.nbytes() / 2 ** 20:.1f} MiB")
+
+        # Drop the store before measuring the next one
+        degrees.graph = None
+        degrees.names, degrees.people, degrees.movies = {}, {}, {}
+
+
+def benchmark_frontier(size, legacy_size):
+    """
+    Times add, contains_state and remove of every frontier.
+    """
+    frontiers = [
+        ("StackFrontier", util.StackFrontier, size),
+        ("QueueFrontier", util.QueueFrontier, size),
+        ("PriorityFrontier", util.PriorityFrontier, size),
+        ("old StackFrontier", LegacyStackFrontier, legacy_size),
+        ("old QueueFrontier", LegacyQueueFrontier, legacy_size),
+    ]
+    for label, frontier_class, n in frontiers:
+        frontier = frontier_class()
+        nodes = [util.Node(i, None, None) for i in range(n)]
+
+        start = time.perf_counter()
+        for node in nodes:
+            frontier.add(node)
+        push = time.perf_counter() - start
+
+        # A fixed number of lookups, half of them missing
+        lookups = min(n, 10_000)
+        start = time.perf_counter()
+        for i in range(lookups):
+            frontier.contains_state(i * 2)
+        contains = time.perf_counter() - start
+
+        start = time.perf_counter()
+        while not frontier.empty():
+            frontier.remove()
+        pop = time.perf_counter() - start
+
+        print(f"{label} ({n} nodes): "
+              f"add {push / n * 1e9:.0f}ns, "
+              f"contains_state {contains / lookups * 1e9:.0f}ns, "
+              f"remove {pop / n * 1e9:.0f}ns per call")
+
+
+class LegacyStackFrontier():
+    """
+    The original list frontier, copying the list on every remove.
+    """
+
+    def __init__(self):
+        self.frontier = []
+
+    def add(self, node):
+        self.frontier.append(node)
+
+    def contains_state(self, state):
+        return any(node.state == state for node in self.frontier)
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        node = self.frontier[-1]
+        self.frontier = self.frontier[:-1]
+        return node
+
+
+class LegacyQueueFrontier(LegacyStackFrontier):
+
+    def remove(self):
+        node = self.frontier[0]
+        self.frontier = self.frontier[1:]
+        return node
+
+
+def build_graph(stars, seed):
+    """
+    Fills the globals of degrees.py with a random cast graph
+    with the given number of stars rows.
+    """
+    rng = random.Random(seed)
+    degrees.graph = None
+    degrees.names, degrees.people, degrees.movies = {}, {}, {}
+
+    # Roughly the shape of the IMDB data, a few stars per movie
+    # and a long tail of people with only one or two movies
+    num_people = max(2, stars // 4)
+    num_movies = max(1, stars // 5)
+    for i in range(num_people):
+        person_id = str(i)
+        name = f"person {i}"
+        degrees.people[person_id] = {"name": name, "birth": "", "movies": set()}
+        degrees.names.setdefault(name, set()).add(person_id)
+    for i in range(num_movies):
+        degrees.movies[str(i)] = {"title": f"movie {i}", "year": "", "stars": set()}
+
+    for _ in range(stars):
+        # Popular people show up in far more movies than everyone else
+        person_id = str(min(num_people - 1, int(rng.paretovariate(1.2)) - 1
+                            if rng.random() < 0.1 else rng.randrange(num_people)))
+        movie_id = str(rng.randrange(num_movies))
+        degrees.people[person_id]["movies"].add(movie_id)
+        degrees.movies[movie_id]["stars"].add(person_id)
+
+
+def report(label, search, pairs, check=None):
+    """
+    Times search over every pair and prints the latency summary.
+    """
+    timings = []
+    for source, target in pairs:
+        start = time.perf_counter()
+        path = search(source, target)
+        timings.append(time.perf_counter() - start)
+
+        # Both searches must agree on the degrees of separation
+        if check is not None:
+            expected = check(source, target)
+            if (path is None) != (expected is None) or (
+                path is not None and len(path) != len(expected)
+            ):
+                raise Exception(f"{label} disagrees on {source} -> {target}")
+
+    if not timings:
+        return
+    timings.sort()
+    print(f"{label}: {len(timings)} queries, "
+          f"mean {statistics.mean(timings) * 1000:.2f}ms, "
+          f"median {statistics.median(timings) * 1000:.2f}ms, "
+          f"max {timings[-1] * 1000:.2f}ms")
+
+
+def scan_shortest_path(source, target):
+    """
+    The original breadth-first search, which scans every movie
+    for each person taken off the frontier.
+    """
+    discovered = set()
+    frontier = util.QueueFrontier()
+    frontier.add(util.Node(source, None, None))
+    if source == target:
+        return []
+
+    while not frontier.empty():
+        cur = frontier.remove()
+        discovered.add(cur.state)
+        for movie in degrees.movies:
+            if cur.state in degrees.movies[movie]["stars"]:
+                for star in degrees.movies[movie]["stars"]:
+                    if star == target:
+                        node = util.Node(star, cur, movie)
+                        path = []
+                        while node.parent is not None:
+                            path.append((node.action, node.state))
+                            node = node.parent
+                        return path[::-1]
+                    if star not in discovered:
+                        frontier.add(util.Node(star, cur, movie))
+
+    return None
+
+
+if __name__ == "__main__":
+    main()
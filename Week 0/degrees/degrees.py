@@ -1,7 +1,20 @@
+import argparse
+import contextlib
 import csv
+import functools
+import importlib.util
+import json
+import multiprocessing
+import os
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+import ingest as delta
+import landmarks
+import paths
+from graph import MoviesView, NamesView, PeopleView
+from nameindex import NameIndex
+from snapshot import csv_key, load_graph, record_delta
+from util import SearchStats, profiled
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +25,50 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed store, when loaded with compact=True
+graph = None
 
-def load_data(directory):
+# Landmark index guiding shortest_path, when loaded with landmark_count
+landmark_index = None
+
+# Prefix and fuzzy search over the names, rebuilt by load_data
+name_index = None
+
+# Results of all_shortest_paths and k_shortest_paths, by internal person ids
+path_cache = paths.PathCache()
+
+
+def load_data(directory, compact=False, cache=True, landmark_count=0):
     """
     Load data from CSV files into memory.
+
+    With compact set, the data is kept in a Graph and
+    names, people and movies become read-only views of it.
+    The Graph is memory-mapped from a snapshot next to the CSV
+    files when cache is set, and the snapshot kept up to date.
+    With landmark_count, the compact store also gets a landmark
+    index, cached the same way, whose bounds answer the queries they
+    settle before shortest_path searches; without compact,
+    landmark_count is ignored.
     """
+    global graph, names, people, movies, landmark_index, name_index
+
+    landmark_index = None
+    path_cache.clear()
+    if compact:
+        graph = load_graph(directory, cache)
+        names = NamesView(graph)
+        people = PeopleView(graph)
+        movies = MoviesView(graph)
+        name_index = graph.name_index
+        if landmark_count:
+            landmark_index = landmarks.load_index(
+                directory, graph, landmark_count, cache)
+        return
+
+    graph = None
+    names, people, movies = {}, {}, {}
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,16 +103,114 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    name_index = NameIndex.build(sorted(names))
+
+
+def ingest(delta_directory, directory=None):
+    """
+    Adds the rows of the CSV files in delta_directory to the loaded data,
+    updating the landmark index and dropping cached paths that could change.
+
+    With directory, the data directory that was loaded, the rows are also
+    appended to its CSV files, snapshot journal and landmark index file.
+    Returns the number of rows read from each file.
+    """
+    rows = delta.read_delta(delta_directory)
+
+    if graph is not None:
+        touched, touched_movies = graph.extend(rows)
+        if landmark_index is not None:
+            landmark_index.update(touched_movies)
+    else:
+        for row in rows["people"]:
+            if row["id"] in people:
+                continue
+            people[row["id"]] = {"name": row["name"], "birth": row["birth"],
+                                 "movies": set()}
+            names.setdefault(row["name"].lower(), set()).add(row["id"])
+            name_index.add(row["name"])
+        for row in rows["movies"]:
+            if row["id"] not in movies:
+                movies[row["id"]] = {"title": row["title"], "year": row["year"],
+                                     "stars": set()}
+        touched = set()
+        for row in rows["stars"]:
+            if row["person_id"] in people and row["movie_id"] in movies:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                touched.add(row["person_id"])
+
+    # New links can shorten or add paths between anyone, except that people
+    # who already share a movie stay one apart, with the same movies unless
+    # one of them got new ones
+    def unaffected(key, dag):
+        return (key[0] == "all" and dag is not False
+                and key[1] not in touched and key[2] not in touched
+                and len(next(dag.paths())) <= 1)
+    path_cache.invalidate(unaffected)
+
+    if directory is not None:
+        old_key = csv_key(directory)
+        delta.append_delta(directory, rows)
+        new_key = csv_key(directory)
+        record_delta(directory, rows, old_key, new_key)
+        if landmark_index is not None:
+            landmarks.write(landmark_index,
+                            os.path.join(directory, landmarks.FILENAME), new_key)
+
+    return {kind: len(rows[kind]) for kind in rows}
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--dict", action="store_true",
+                        help="load into plain dicts instead of the compact store")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always parse the CSV files, ignoring the snapshot")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="COUNT",
+                        help="answer what it can from the bounds of COUNT landmarks "
+                             "before searching (compact store only, not with --dict)")
+    parser.add_argument("--all", action="store_true",
+                        help="print every shortest path, not just one")
+    parser.add_argument("-k", type=int, default=1,
+                        help="print the k shortest paths")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer tab separated name pairs from FILE (- for "
+                             "stdin) as JSON lines instead of asking for names")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes answering the batch")
+    parser.add_argument("--stats", action="store_true",
+                        help="report what each search did: people expanded, edges "
+                             "scanned, peak frontier and time")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="with --stats, also report the peak memory of each "
+                             "search, which makes searching much slower")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"],
+                        help="profile the searches of this process, printing "
+                             "the report to stderr")
+    args = parser.parse_args()
+    # The landmark index is built on the compact store, plain dicts have none
+    if args.dict and args.landmarks:
+        parser.error("--landmarks needs the compact store, it cannot be used with --dict")
+    if args.profile == "pyinstrument" and importlib.util.find_spec("pyinstrument") is None:
+        sys.exit("pyinstrument is not installed, pip install pyinstrument")
+    options = {"stats": args.stats, "trace_memory": args.trace_memory}
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    print("Loading data...", file=sys.stderr if args.batch else sys.stdout)
+    load_data(args.directory, compact=not args.dict, cache=not args.no_cache,
+              landmark_count=args.landmarks)
+    print("Data loaded.", file=sys.stderr if args.batch else sys.stdout)
+
+    if args.batch:
+        with profiled(args.profile) if args.profile else contextlib.nullcontext():
+            if args.batch == "-":
+                run_batch(sys.stdin, sys.stdout, args.workers, **options)
+            else:
+                with open(args.batch, encoding="utf-8") as f:
+                    run_batch(f, sys.stdout, args.workers, **options)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,11 +219,24 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    stats = SearchStats(args.trace_memory) if args.stats or args.trace_memory else None
+    with profiled(args.profile) if args.profile else contextlib.nullcontext(), \
+            stats.measure() if stats else contextlib.nullcontext():
+        if args.all:
+            results = list(all_shortest_paths(source, target, stats))
+        elif args.k > 1:
+            results = k_shortest_paths(source, target, args.k, stats)
+        else:
+            path = shortest_path(source, target, stats)
+            results = [] if path is None else [path]
+    if stats:
+        print(json.dumps(stats.as_dict()), file=sys.stderr)
 
-    if path is None:
+    if not results:
         print("Not connected.")
-    else:
+    for number, path in enumerate(results):
+        if len(results) > 1:
+            print(f"Path {number + 1}:")
         degrees = len(path)
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
@@ -84,60 +247,264 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def run_batch(lines, output, workers=1, **options):
+    """
+    Answers every "source<TAB>target" line, writing one JSON object per line
+    in the same order as the input. Options are passed on to answer.
+    """
+    pairs = (line.rstrip("\n").split("\t") for line in lines if line.strip())
+    if workers <= 1:
+        for pair in pairs:
+            output.write(json.dumps(answer_pair(pair, **options)) + "\n")
+            output.flush()
+        return
+
+    # Forked workers inherit the loaded data instead of receiving a pickled copy
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        for result in pool.imap(functools.partial(answer_pair, **options),
+                                pairs, chunksize=16):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+
+def answer_pair(pair, **options):
+    """
+    Answers a [source, target] pair of names, see answer.
+    """
+    if len(pair) != 2:
+        return {"error": "expected a source and a target separated by a tab"}
+    return answer(pair[0], pair[1], **options)
+
+
+def answer(source_name, target_name, stats=False, trace_memory=False):
+    """
+    Returns the degrees of separation between two people as a dict
+    ready to be written as JSON, or a dict with an error.
+
+    Names are resolved without asking, so an ambiguous name is an error
+    that lists the candidates, whose person_id may be given instead.
+    With stats or trace_memory, the dict also has the "stats" of the
+    search, see SearchStats.
+    """
+    result = {"source": source_name, "target": target_name}
+    ids = []
+    for name in [source_name, target_name]:
+        person_ids = person_ids_for_name(name)
+        if len(person_ids) == 0:
+            result["error"] = f"Person not found: {name}"
+            result["suggestions"] = suggest_names(name)
+            return result
+        if len(person_ids) > 1:
+            result["error"] = f"Ambiguous name: {name}"
+            result["candidates"] = [
+                {"id": person_id, "birth": people[person_id]["birth"]}
+                for person_id in sorted(person_ids)
+            ]
+            return result
+        ids.append(person_ids[0])
+
+    if stats or trace_memory:
+        search_stats = SearchStats(trace_memory)
+        with search_stats.measure():
+            path = shortest_path(ids[0], ids[1], search_stats)
+        result["stats"] = search_stats.as_dict()
+    else:
+        path = shortest_path(ids[0], ids[1])
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+        return result
+
+    result["degrees"] = len(path)
+    result["path"] = [
+        {"movie_id": movie_id, "movie": movies[movie_id]["title"],
+         "person_id": person_id, "person": people[person_id]["name"]}
+        for movie_id, person_id in path
+    ]
+    return result
+
+
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+    If stats is a SearchStats, what the search did is counted into it.
+    """
+    # The compact store is searched over its integer ids
+    if graph is not None:
+        source, target = graph.person_index(source), graph.person_index(target)
+        if landmark_index is not None:
+            path = landmark_index.shortest_path(source, target, search, stats)
+        else:
+            path = search(source, target, graph.neighbors, stats)
+        return None if path is None else external_path(path)
+
+    return search(source, target, neighbors_for_person, stats)
+
+
+def all_shortest_paths(source, target, stats=None):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs
+    that connects the source to the target, one at a time.
+
+    Yields nothing if there is no possible path.
+    If stats is a SearchStats, what the search did is counted into it,
+    nothing at all when the answer was cached.
     """
+    neighbors = neighbors_for_person
+    if graph is not None:
+        source, target = graph.person_index(source), graph.person_index(target)
+        neighbors = graph.neighbors
 
-    # TODO
-    # The paople who have been covered already so far
-    discovered = set()
-
-    # Going to store the people to be discovered next
-    frontier = QueueFrontier()
-
-    # Storing in the frontier in the form of id, parent_id and movie_id linked with parent
-    frontier.add(Node(source, None, None))
-
-    found = False
-    # Using a breadth-first search
-    while not frontier.empty():
-        cur = frontier.remove()
-        # Every time a new star is encounterd, it is added into discovered so that 
-        # I can prevent repetition
-        discovered.add(cur.state)
-        for movie in movies:
-            # Find the movies that this star has casted before
-            if cur.state in movies[movie]['stars']:
-                for star in movies[movie]['stars']:
-                    # If the movie also has the target, then the search is done
-                    if star == target:
-                        found = True
-                        end_node = Node(star, cur, movie)
-                        break
-                    # Add the star that is not discovered yet
-                    if star not in discovered:
-                        frontier.add(Node(star, cur, movie))
-                if found:
-                    break
-
-        if found:
-            break
-    # Backtracking to find the path
-    if found:
-        res = []
-        while end_node.parent is not None:
-            res.append((end_node.action, end_node.state))
-            end_node = end_node.parent
-        # Reverse it because the path is from target
-        return res[::-1]
+    # Unconnected pairs are cached as False, and reversed pairs share an entry
+    key, dag = path_cache.get([("all", source, target), ("all", target, source)])
+    if key is None:
+        dag = paths.shortest_path_dag(source, target, neighbors, stats)
+        if dag is None:
+            dag = False
+        path_cache.put(("all", source, target), dag, 1 if dag is False else len(dag) + 1)
+    elif dag is not False and key[1] != source:
+        dag = dag.reversed()
+    if dag is False:
+        return
 
+    for path in dag.paths():
+        yield external_path(path)
+
+
+def k_shortest_paths(source, target, k, stats=None):
+    """
+    Returns up to k shortest lists of (movie_id, person_id) pairs
+    that connect the source to the target without repeating a person,
+    shortest first.
+
+    If stats is a SearchStats, what the searches did is counted into it,
+    nothing at all when the answer was cached.
+    """
+    neighbors = neighbors_for_person
+    if graph is not None:
+        source, target = graph.person_index(source), graph.person_index(target)
+        neighbors = graph.neighbors
+
+    # Entries are (k, paths), which also answer any smaller k
+    key, entry = path_cache.get([("k", source, target), ("k", target, source)],
+                                usable=lambda entry: entry[0] >= k)
+    if key is None:
+        found = paths.k_shortest_paths(source, target, k, neighbors, stats)
+        path_cache.put(("k", source, target), (k, found),
+                       sum(len(path) for path in found) + 1)
+    elif key[1] != source:
+        found = [paths.reverse_path(path, target) for path in entry[1]]
+    else:
+        found = entry[1]
+
+    return [external_path(path) for path in found[:k]]
+
+
+def external_path(path):
+    """
+    Returns a path of internal ids as (movie_id, person_id) pairs.
+    """
+    if graph is None:
+        return path
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def search(source, target, neighbors, stats=None):
+    """
+    Bidirectional breadth-first search from source to target, where
+    neighbors(person) gives the (movie, person) pairs next to a person.
+
+    Returns the shortest list of (movie, person) pairs, or None.
+    If stats is a SearchStats, what the search did is counted into it.
+    """
+    if source == target:
+        return []
+
+    # Counting is only wired in when asked for, so it costs nothing otherwise
+    if stats is not None:
+        neighbors = stats.counting(neighbors)
+
+    # Maps every discovered person to the (movie, person) it was reached from,
+    # one map growing out of the source and one growing out of the target
+    forward = {source: None}
+    backward = {target: None}
+
+    # Only the last discovered level of each side needs to be expanded
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    # Bidirectional breadth-first search, the two sides meet in the middle
+    while forward_frontier and backward_frontier:
+        if stats is not None:
+            stats.frontier(len(forward_frontier) + len(backward_frontier))
+
+        # Always grow the smaller side, it is the cheaper one to expand
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(
+                forward_frontier, forward, backward, neighbors)
+        else:
+            backward_frontier, meeting = expand_level(
+                backward_frontier, backward, forward, neighbors)
+
+        if meeting is not None:
+            if stats is not None:
+                stats.discovered += len(forward) + len(backward)
+            return join_path(meeting, forward, backward)
+
+    if stats is not None:
+        stats.discovered += len(forward) + len(backward)
     return None
 
 
+def expand_level(frontier, parents, other_parents, neighbors):
+    """
+    Expands one whole level of a breadth-first search side.
+
+    Returns the next level and the first person also discovered
+    by the other side, or None if the sides have not met yet.
+    """
+    next_frontier = []
+    for person in frontier:
+        for movie, neighbor in neighbors(person):
+            if neighbor in parents:
+                continue
+            parents[neighbor] = (movie, person)
+
+            # Nothing is ever in both maps before this point, so the neighbor
+            # must sit on the last level of the other side and this is a shortest path
+            if neighbor in other_parents:
+                return next_frontier, neighbor
+            next_frontier.append(neighbor)
+
+    return next_frontier, None
+
+
+def join_path(meeting, forward, backward):
+    """
+    Joins the two halves of a bidirectional search at the meeting person
+    into a list of (movie, person) pairs from source to target.
+    """
+    # Backtracking from the meeting person to the source
+    path = []
+    person = meeting
+    while forward[person] is not None:
+        movie, parent = forward[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+
+    # Then following the other side from the meeting person to the target
+    person = meeting
+    while backward[person] is not None:
+        movie, person = backward[person]
+        path.append((movie, person))
+
+    return path
+
 
 def person_id_for_name(name):
     """
@@ -146,6 +513,20 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        # Offer the names starting with it, or else the closest ones,
+        # rather than making the user start over
+        suggestions = suggest_names(name)
+        if not suggestions:
+            return None
+        print(f"No '{name}', did you mean:")
+        for i, suggestion in enumerate(suggestions):
+            print(f"{i + 1}: {suggestion}")
+        try:
+            choice = int(input("Number: "))
+            if 1 <= choice <= len(suggestions):
+                return person_id_for_name(suggestions[choice - 1])
+        except ValueError:
+            pass
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -165,11 +546,41 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def suggest_names(name, limit=10):
+    """
+    Returns up to limit names of people for a name not found,
+    the ones starting with it or else the closest ones.
+    """
+    if name_index is None:
+        return []
+    suggestions = []
+    for key in name_index.suggest(name, limit):
+        # The index is lowercase, the names of people are not
+        person_id = next(iter(names[key]))
+        suggestions.append(people[person_id]["name"])
+    return suggestions
+
+
+def person_ids_for_name(name):
+    """
+    Returns every IMDB id for a person's name without asking,
+    also accepting a person_id in place of the name.
+    """
+    person_ids = list(names.get(name.lower(), set()))
+    if not person_ids and name in people:
+        person_ids = [name]
+    return person_ids
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in graph.neighbors(graph.person_index(person_id))}
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
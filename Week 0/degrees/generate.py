@@ -0,0 +1,127 @@
+"""
+Generates a synthetic IMDB-like dataset for degrees.py.
+
+Rows are streamed straight to people.csv, movies.csv and stars.csv, so
+the size of the dataset is only limited by the disk. Like the real data,
+cast sizes and the number of movies per person follow power laws: a few
+people star in hundreds of movies and most in only one or two, and some
+people never starred in anything, which leaves unconnected pairs.
+
+    python generate.py synthetic --stars 1000000
+"""
+import argparse
+import csv
+import os
+import random
+
+FIRST_NAMES = [
+    "Alice", "Ben", "Carla", "David", "Emma", "Frank", "Grace", "Henry",
+    "Iris", "Jack", "Kate", "Liam", "Maya", "Noah", "Olivia", "Peter",
+    "Quinn", "Rosa", "Sam", "Tara", "Uma", "Victor", "Wendy", "Xavier",
+    "Yara", "Zane"
+]
+LAST_NAMES = [
+    "Adams", "Baker", "Clark", "Diaz", "Evans", "Foster", "Garcia", "Hughes",
+    "Ito", "Jones", "Kim", "Lopez", "Miller", "Nguyen", "Owens", "Patel",
+    "Quinn", "Reyes", "Smith", "Turner", "Ueda", "Vargas", "Walker", "Xu",
+    "Young", "Zhang"
+]
+TITLE_WORDS = [
+    "Night", "River", "Last", "Silent", "Golden", "Storm", "City", "Dream",
+    "Shadow", "Summer", "Iron", "Lost", "Red", "Garden", "Empire", "Echo"
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--stars", type=int, default=1_000_000,
+                        help="number of stars rows, give or take one movie")
+    parser.add_argument("--people-per-star", type=float, default=0.8,
+                        help="people rows for every stars row")
+    parser.add_argument("--cast-size", type=float, default=4.0,
+                        help="mean number of stars per movie")
+    parser.add_argument("--skew", type=float, default=1.5,
+                        help="how strongly a few people dominate the casts")
+    parser.add_argument("--seed", type=int, default=50)
+    args = parser.parse_args()
+
+    counts = generate(args.directory, args.stars, args.people_per_star,
+                      args.cast_size, args.skew, args.seed)
+    print(f"Wrote {counts['people']} people, {counts['movies']} movies "
+          f"and {counts['stars']} stars to {args.directory}.")
+
+
+def generate(directory, stars, people_per_star=0.8, cast_size=4.0,
+             skew=1.5, seed=50):
+    """
+    Writes the three CSV files of a random dataset to directory.
+
+    Returns the number of rows written to each file.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    num_people = max(2, int(stars * people_per_star))
+
+    # Popularity is by position: person u ** skew * num_people for a uniform u
+    # is a power law, without keeping any per-person state
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            writer.writerow([
+                person_id(i),
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} "
+                f"{rng.choice(LAST_NAMES)}",
+                rng.randint(1900, 2005) if rng.random() < 0.8 else ""
+            ])
+
+    # Movies keep coming until enough stars rows are written
+    written = 0
+    num_movies = 0
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as movies_file, \
+            open(os.path.join(directory, "stars.csv"), "w",
+                 encoding="utf-8", newline="") as stars_file:
+        movies = csv.writer(movies_file)
+        movies.writerow(["id", "title", "year"])
+        cast = csv.writer(stars_file)
+        cast.writerow(["person_id", "movie_id"])
+
+        while written < stars:
+            j = num_movies
+            num_movies += 1
+            movies.writerow([
+                movie_id(j),
+                " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 3))),
+                rng.randint(1920, 2020)
+            ])
+
+            # Cast sizes are heavy tailed too, with the requested mean
+            size = min(200, max(1, round(rng.paretovariate(1.5) * cast_size / 3)))
+            members = {int(rng.random() ** skew * num_people) for _ in range(size)}
+            for i in members:
+                cast.writerow([person_id(i), movie_id(j)])
+            written += len(members)
+
+    return {"people": num_people, "movies": num_movies, "stars": written}
+
+
+def person_id(i):
+    """
+    Returns the IMDB-like id of the ith person.
+    """
+    return str(100000 + i)
+
+
+def movie_id(j):
+    """
+    Returns the IMDB-like id of the jth movie.
+    """
+    return str(5000000 + j)
+
+
+if __name__ == "__main__":
+    main()
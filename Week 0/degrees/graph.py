@@ -0,0 +1,502 @@
+"""
+Compact store for the degrees dataset.
+
+People and movies are interned to dense integers in CSV order, and the
+person <-> movie relation is kept as two CSR (compressed sparse row)
+adjacency lists: person i starred in person_movies[person_offsets[i]:
+person_offsets[i + 1]], and movie j has stars movie_stars[movie_offsets[j]:
+movie_offsets[j + 1]]. Strings are packed into one utf-8 blob per column.
+"""
+import csv
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+from nameindex import NameIndex, UniqueNames, build_grams, name_starts
+
+
+class StringTable():
+    """
+    Append-only list of strings packed into a single utf-8 blob.
+    """
+
+    def __init__(self, blob=None, offsets=None):
+        self.blob = bytearray() if blob is None else blob
+        self.offsets = array("q", [0]) if offsets is None else offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, s):
+        # A table mapped from a snapshot is read-only, so it is copied first
+        if not isinstance(self.blob, bytearray):
+            self.blob = bytearray(self.blob)
+            offsets = array("q")
+            offsets.frombytes(self.offsets.cast("B"))
+            self.offsets = offsets
+        self.blob += s.encode("utf-8")
+        self.offsets.append(len(self.blob))
+
+    def nbytes(self):
+        return len(self.blob) + len(self.offsets) * self.offsets.itemsize
+
+
+class SortedKeys():
+    """
+    Sequence of table[order[i]], which is sorted, so that bisect can
+    binary search it without materializing the keys.
+    """
+
+    def __init__(self, table, order, lower=False):
+        self.table = table
+        self.order = order
+        self.lower = lower
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        key = self.table[self.order[i]]
+        return key.lower() if self.lower else key
+
+
+class Graph():
+    """
+    Bipartite person <-> movie graph over dense integer ids.
+    """
+
+    def __init__(self, columns):
+        # Strings of every person and movie, by integer id
+        self.person_ids = columns["person_ids"]
+        self.person_names = columns["person_names"]
+        self.person_births = columns["person_births"]
+        self.movie_ids = columns["movie_ids"]
+        self.movie_titles = columns["movie_titles"]
+        self.movie_years = columns["movie_years"]
+
+        # CSR adjacency in both directions
+        self.person_offsets = columns["person_offsets"]
+        self.person_movies = columns["person_movies"]
+        self.movie_offsets = columns["movie_offsets"]
+        self.movie_stars = columns["movie_stars"]
+
+        # Permutations sorting people by id and by lowercase name,
+        # and movies by id, used for lookups by binary search
+        self.person_id_order = columns["person_id_order"]
+        self.person_name_order = columns["person_name_order"]
+        self.movie_id_order = columns["movie_id_order"]
+
+        self.person_id_keys = SortedKeys(self.person_ids, self.person_id_order)
+        self.person_name_keys = SortedKeys(
+            self.person_names, self.person_name_order, lower=True)
+        self.movie_id_keys = SortedKeys(self.movie_ids, self.movie_id_order)
+
+        # Prefix and fuzzy search over the distinct names
+        self.name_starts = columns["name_starts"]
+        self.name_gram_offsets = columns["name_gram_offsets"]
+        self.name_grams = columns["name_grams"]
+        self.name_index = NameIndex(UniqueNames(self, self.name_starts),
+                                    self.name_gram_offsets, self.name_grams)
+
+        # Rows added by extend after the CSR arrays were built: lookups for the
+        # new people and movies, and the new movies of each person and stars
+        # of each movie, on top of the CSR adjacency
+        self.base_people = len(self.person_offsets) - 1
+        self.base_movies = len(self.movie_offsets) - 1
+        self.added_person_ids = {}
+        self.added_person_names = {}
+        self.added_movie_ids = {}
+        self.extra_movies = {}
+        self.extra_stars = {}
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Builds the graph from people.csv, movies.csv and stars.csv.
+        """
+        columns = {key: StringTable() for key in [
+            "person_ids", "person_names", "person_births",
+            "movie_ids", "movie_titles", "movie_years"
+        ]}
+
+        # Only needed while loading, lookups afterwards use binary search
+        person_index = {}
+        movie_index = {}
+
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                if row["id"] in person_index:
+                    continue
+                person_index[row["id"]] = len(person_index)
+                columns["person_ids"].append(row["id"])
+                columns["person_names"].append(row["name"])
+                columns["person_births"].append(row["birth"])
+
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                if row["id"] in movie_index:
+                    continue
+                movie_index[row["id"]] = len(movie_index)
+                columns["movie_ids"].append(row["id"])
+                columns["movie_titles"].append(row["title"])
+                columns["movie_years"].append(row["year"])
+
+        star_people = array("i")
+        star_movies = array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                person = person_index.get(row["person_id"])
+                movie = movie_index.get(row["movie_id"])
+                if person is None or movie is None:
+                    continue
+                star_people.append(person)
+                star_movies.append(movie)
+
+        columns["person_offsets"], columns["person_movies"] = build_csr(
+            star_people, star_movies, len(person_index))
+        columns["movie_offsets"], columns["movie_stars"] = build_csr(
+            star_movies, star_people, len(movie_index))
+
+        columns.update(sort_orders(columns))
+        columns.update(name_columns(columns))
+        return cls(columns)
+
+    def extend(self, rows):
+        """
+        Adds the "people", "movies" and "stars" rows of a delta, each a list
+        of CSV rows as dicts, without rebuilding the CSR arrays.
+
+        Returns the integer ids of the people and movies that got new stars.
+        """
+        for row in rows.get("people", []):
+            if self.find_person(row["id"]) is not None:
+                continue
+            person = len(self.person_ids)
+            self.person_ids.append(row["id"])
+            self.person_names.append(row["name"])
+            self.person_births.append(row["birth"])
+            self.added_person_ids[row["id"]] = person
+            self.added_person_names.setdefault(row["name"].lower(), []).append(person)
+            self.name_index.add(row["name"])
+
+        for row in rows.get("movies", []):
+            if self.find_movie(row["id"]) is not None:
+                continue
+            movie = len(self.movie_ids)
+            self.movie_ids.append(row["id"])
+            self.movie_titles.append(row["title"])
+            self.movie_years.append(row["year"])
+            self.added_movie_ids[row["id"]] = movie
+
+        people = set()
+        movies = set()
+        for row in rows.get("stars", []):
+            person = self.find_person(row["person_id"])
+            movie = self.find_movie(row["movie_id"])
+            if person is None or movie is None or movie in self.movies_of(person):
+                continue
+            self.extra_movies.setdefault(person, []).append(movie)
+            self.extra_stars.setdefault(movie, []).append(person)
+            people.add(person)
+            movies.add(movie)
+        return people, movies
+
+    def find_person(self, person_id):
+        """
+        Returns the integer id of a person_id, or None if unknown.
+        """
+        person = self.added_person_ids.get(person_id)
+        if person is not None:
+            return person
+        i = bisect_left(self.person_id_keys, person_id)
+        if i == len(self.person_id_keys) or self.person_id_keys[i] != person_id:
+            return None
+        return self.person_id_order[i]
+
+    def find_movie(self, movie_id):
+        """
+        Returns the integer id of a movie_id, or None if unknown.
+        """
+        movie = self.added_movie_ids.get(movie_id)
+        if movie is not None:
+            return movie
+        i = bisect_left(self.movie_id_keys, movie_id)
+        if i == len(self.movie_id_keys) or self.movie_id_keys[i] != movie_id:
+            return None
+        return self.movie_id_order[i]
+
+    def person_index(self, person_id):
+        """
+        Returns the integer id of a person_id, raising KeyError if unknown.
+        """
+        person = self.find_person(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return person
+
+    def movie_index(self, movie_id):
+        """
+        Returns the integer id of a movie_id, raising KeyError if unknown.
+        """
+        movie = self.find_movie(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        return movie
+
+    def people_named(self, name):
+        """
+        Returns the integer ids of every person with the name, ignoring case.
+        """
+        name = name.lower()
+        start = bisect_left(self.person_name_keys, name)
+        end = bisect_right(self.person_name_keys, name, start)
+        return ([self.person_name_order[i] for i in range(start, end)]
+                + self.added_person_names.get(name, []))
+
+    def movies_of(self, person):
+        """
+        Returns the integer ids of the movies a person starred in.
+        """
+        movies = ()
+        if person < self.base_people:
+            movies = self.person_movies[
+                self.person_offsets[person]:self.person_offsets[person + 1]]
+        extra = self.extra_movies.get(person)
+        return list(movies) + extra if extra else movies
+
+    def stars_of(self, movie):
+        """
+        Returns the integer ids of the people who starred in a movie.
+        """
+        stars = ()
+        if movie < self.base_movies:
+            stars = self.movie_stars[
+                self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+        extra = self.extra_stars.get(movie)
+        return list(stars) + extra if extra else stars
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) integer pairs for people
+        who starred with a given person.
+        """
+        # People added by extend, and the new movies of anyone, are not in
+        # the CSR arrays (an added person with no movies has no neighbors)
+        if person >= self.base_people or person in self.extra_movies:
+            for movie in self.movies_of(person):
+                for star in self.stars_of(movie):
+                    yield movie, star
+            return
+
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        extra_stars = self.extra_stars
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_stars[j]
+            # New stars of a movie already in the arrays
+            if extra_stars and movie in extra_stars:
+                for star in extra_stars[movie]:
+                    yield movie, star
+
+    def nbytes(self):
+        """
+        Returns the number of bytes held by the columns of the graph.
+        """
+        total = 0
+        for column in [self.person_ids, self.person_names, self.person_births,
+                       self.movie_ids, self.movie_titles, self.movie_years]:
+            total += column.nbytes()
+        for column in [self.person_offsets, self.person_movies,
+                       self.movie_offsets, self.movie_stars,
+                       self.person_id_order, self.person_name_order,
+                       self.movie_id_order, self.name_starts,
+                       self.name_gram_offsets, self.name_grams]:
+            total += len(column) * column.itemsize
+        return total
+
+
+def levels(graph, source):
+    """
+    Breadth-first search from source, one whole level at a time.
+
+    Yields the people at each degree of separation in turn, starting with
+    [source], with the number of person <-> movie links scanned to find them.
+    """
+    movies_of = graph.movies_of
+    stars_of = graph.stars_of
+
+    seen = bytearray(len(graph.person_ids))
+    # Every movie only needs to be scanned once, by the first star to reach it
+    scanned = bytearray(len(graph.movie_ids))
+
+    seen[source] = 1
+    frontier = [source]
+    yield frontier, 0
+    while True:
+        edges = 0
+        next_frontier = []
+        for person in frontier:
+            movies = movies_of(person)
+            edges += len(movies)
+            for movie in movies:
+                if scanned[movie]:
+                    continue
+                scanned[movie] = 1
+                stars = stars_of(movie)
+                edges += len(stars)
+                for star in stars:
+                    if not seen[star]:
+                        seen[star] = 1
+                        next_frontier.append(star)
+        if not next_frontier:
+            return
+        frontier = next_frontier
+        yield frontier, edges
+
+
+def build_csr(sources, targets, size):
+    """
+    Groups the (source, target) edges by source with a counting sort.
+
+    Returns the offsets, of length size + 1, and the targets in source order.
+    """
+    offsets = array("q", bytes(8 * (size + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    position = array("q", offsets)
+    indices = array("i", bytes(4 * len(sources)))
+    for source, target in zip(sources, targets):
+        indices[position[source]] = target
+        position[source] += 1
+    return offsets, indices
+
+
+def sort_orders(columns):
+    """
+    Returns the permutations sorting people by id and name, and movies by id.
+    """
+    person_ids = list(columns["person_ids"])
+    person_names = [name.lower() for name in columns["person_names"]]
+    movie_ids = list(columns["movie_ids"])
+    return {
+        "person_id_order": array("i", sorted(
+            range(len(person_ids)), key=person_ids.__getitem__)),
+        "person_name_order": array("i", sorted(
+            range(len(person_names)), key=person_names.__getitem__)),
+        "movie_id_order": array("i", sorted(
+            range(len(movie_ids)), key=movie_ids.__getitem__)),
+    }
+
+
+def name_columns(columns):
+    """
+    Returns the columns of the name index, the positions where a new name
+    starts in the sorted names and the trigram index of the distinct names.
+    """
+    keys = SortedKeys(columns["person_names"], columns["person_name_order"],
+                      lower=True)
+    starts = name_starts(keys)
+    gram_offsets, grams = build_grams([keys[i] for i in starts])
+    return {
+        "name_starts": starts,
+        "name_gram_offsets": gram_offsets,
+        "name_grams": grams
+    }
+
+
+class PeopleView(Mapping):
+    """
+    Read-only view of a graph shaped like the people dict of degrees.py.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index(person_id)
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[movie] for movie in graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """
+    Read-only view of a graph shaped like the movies dict of degrees.py.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index(movie_id)
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[person] for person in graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+
+class NamesView(Mapping):
+    """
+    Read-only view of a graph shaped like the names dict of degrees.py.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        people = self.graph.people_named(name)
+        if not people or name != name.lower():
+            raise KeyError(name)
+        return {self.graph.person_ids[person] for person in people}
+
+    def __iter__(self):
+        # Names are sorted, so repeated names are next to each other
+        previous = None
+        for name in self.graph.person_name_keys:
+            if name != previous:
+                yield name
+            previous = name
+
+        # Then the names only added by extend
+        for name in self.graph.added_person_names:
+            if len(self.graph.people_named(name)) == len(
+                self.graph.added_person_names[name]
+            ):
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
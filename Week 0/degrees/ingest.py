@@ -0,0 +1,86 @@
+"""
+Incremental ingestion of new rows into a degrees dataset.
+
+A delta is a directory with any of people.csv, movies.csv and stars.csv,
+in the same format as the dataset. Its rows are appended to the dataset's
+CSV files, and to the snapshot journal and landmark index built on them,
+so that neither needs a full rebuild.
+
+    python ingest.py large delta
+"""
+import argparse
+import csv
+import os
+import time
+
+import degrees
+
+FIELDS = {
+    "people": ["id", "name", "birth"],
+    "movies": ["id", "title", "year"],
+    "stars": ["person_id", "movie_id"]
+}
+
+
+def read_delta(directory):
+    """
+    Returns the rows of each CSV file in directory as lists of dicts,
+    keyed by "people", "movies" and "stars".
+    """
+    rows = {}
+    for kind, fields in FIELDS.items():
+        path = os.path.join(directory, f"{kind}.csv")
+        if not os.path.exists(path):
+            rows[kind] = []
+            continue
+        with open(path, encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            rows[kind] = [{field: row[field] for field in fields} for row in reader]
+    return rows
+
+
+def append_delta(directory, rows):
+    """
+    Appends the rows of a delta to the CSV files of the dataset in directory.
+    """
+    for kind, fields in FIELDS.items():
+        if not rows.get(kind):
+            continue
+        path = os.path.join(directory, f"{kind}.csv")
+
+        # The last row of the dataset may not end with a newline
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            needs_newline = False
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) not in b"\r\n"
+
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            if needs_newline:
+                f.write("\r\n")
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writerows(rows[kind])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="dataset to add the rows to")
+    parser.add_argument("delta", help="directory with the new rows")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="COUNT",
+                        help="also keep a landmark index of COUNT landmarks up to date")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    degrees.load_data(args.directory, compact=True, landmark_count=args.landmarks)
+    print(f"Loaded {args.directory} in {time.perf_counter() - start:.2f}s.")
+
+    start = time.perf_counter()
+    counts = degrees.ingest(args.delta, args.directory)
+    print(f"Ingested {counts['people']} people, {counts['movies']} movies and "
+          f"{counts['stars']} stars in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Landmark distance oracle (ALT) for the compact degrees graph.
+
+A few well connected people are picked as landmarks and the degrees of
+separation from each of them to everyone are stored, one byte per person.
+By the triangle inequality, for any landmark L
+
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+
+which gives instant bounds on the separation of any pair. A query is
+answered from the bounds alone when a landmark shows the two people are not
+connected, or when the bounds meet and the path can be walked down the
+distances of the landmark they meet at; any other query goes to the
+bidirectional search, which expands far fewer people than an A* search
+steered by the lower bound.
+
+    python landmarks.py build large --count 16
+    python landmarks.py report large --queries 200
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+from array import array
+
+from graph import levels
+from paths import reverse_path
+from snapshot import csv_key, load_graph, read_file, write_file
+from util import SearchStats
+
+MAGIC = b"LANDMRK\0"
+VERSION = 1
+FILENAME = "degrees.landmarks"
+
+# Distances are stored in one byte, this one meaning not connected
+UNREACHABLE = 255
+
+
+class LandmarkIndex():
+    """
+    Distances from every landmark to every person of a graph.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count):
+        """
+        Picks the count people with the most co-stars as landmarks
+        and runs a breadth-first search from each of them.
+        """
+        landmarks = array("i", select_landmarks(graph, count))
+        distances = [distances_from(graph, landmark) for landmark in landmarks]
+        return cls(graph, landmarks, distances)
+
+    def bounds(self, source, target):
+        """
+        Returns the (lower, upper) bounds on the degrees of separation
+        of two integer person ids, lower being None if they are not connected
+        and upper being None if no landmark reaches them.
+        """
+        lower = 0
+        upper = None
+        for distance in self.distances:
+            s, t = distance[source], distance[target]
+            if s == UNREACHABLE and t == UNREACHABLE:
+                continue
+            # A landmark reaching only one of them splits their components
+            if s == UNREACHABLE or t == UNREACHABLE:
+                return None, None
+            lower = max(lower, abs(s - t))
+            upper = s + t if upper is None else min(upper, s + t)
+        if source == target:
+            return 0, 0
+        return lower, upper
+
+    def shortest_path(self, source, target, search, stats=None):
+        """
+        Returns the shortest list of (movie, person) pairs between two
+        integer person ids, or None, from the bounds when they settle it
+        and otherwise from search(source, target, neighbors, stats).
+
+        If stats is a SearchStats, what the search did is counted into it.
+        """
+        lower, upper = self.bounds(source, target)
+        if lower is None:
+            return None
+        if lower == upper:
+            path = self.path_through_landmark(source, target, upper)
+            if path is not None:
+                return path
+        return search(source, target, self.graph.neighbors, stats)
+
+    def path_through_landmark(self, source, target, length):
+        """
+        Returns a path of the given length from source to target through
+        a landmark that far from the two, or None if there is none.
+        """
+        for distance in self.distances:
+            s, t = distance[source], distance[target]
+            # Capped distances are not exact, they cannot be walked down
+            if s + t != length or max(s, t) >= UNREACHABLE - 1:
+                continue
+            to_landmark = self.descend(distance, source)
+            from_landmark = self.descend(distance, target)
+            if to_landmark is not None and from_landmark is not None:
+                return to_landmark + reverse_path(from_landmark, target)
+        return None
+
+    def descend(self, distance, person):
+        """
+        Returns a shortest path from person to the landmark of distance,
+        each step to a co-star one closer to it.
+        """
+        path = []
+        level = distance[person]
+        while level:
+            for movie, neighbor in self.graph.neighbors(person):
+                if distance[neighbor] == level - 1:
+                    break
+            else:
+                return None
+            path.append((movie, neighbor))
+            person = neighbor
+            level -= 1
+        return path
+
+    def update(self, movies):
+        """
+        Lowers the distances after Graph.extend added stars to movies,
+        only revisiting the people whose distance actually dropped.
+        """
+        graph = self.graph
+        people = len(graph.person_ids)
+        for i, distance in enumerate(self.distances):
+            # Tables mapped from the index file are read-only
+            if not isinstance(distance, bytearray):
+                distance = bytearray(distance)
+            distance += bytearray([UNREACHABLE]) * (people - len(distance))
+            self.distances[i] = distance
+
+            # Everyone in a touched movie is at most one more than its nearest star
+            lowered = []
+            for movie in movies:
+                stars = graph.stars_of(movie)
+                nearest = min(distance[star] for star in stars)
+                if nearest >= UNREACHABLE - 1:
+                    continue
+                for star in stars:
+                    if distance[star] > nearest + 1:
+                        distance[star] = nearest + 1
+                        heapq.heappush(lowered, (nearest + 1, star))
+
+            # Then the drops spread out, nearest first like a search
+            while lowered:
+                level, person = heapq.heappop(lowered)
+                if level != distance[person] or level >= UNREACHABLE - 1:
+                    continue
+                for movie in graph.movies_of(person):
+                    for star in graph.stars_of(movie):
+                        if distance[star] > level + 1:
+                            distance[star] = level + 1
+                            heapq.heappush(lowered, (level + 1, star))
+
+    def nbytes(self):
+        """
+        Returns the number of bytes of the distance tables.
+        """
+        return len(self.landmarks) * 4 + sum(len(d) for d in self.distances)
+
+
+def select_landmarks(graph, count):
+    """
+    Returns the count people with the most co-star slots across their movies.
+    """
+    def degree(person):
+        return sum(len(graph.stars_of(movie)) - 1
+                   for movie in graph.movies_of(person))
+    return heapq.nlargest(count, range(len(graph.person_ids)), key=degree)
+
+
+def distances_from(graph, source):
+    """
+    Breadth-first search from source, returning the degrees of separation
+    to every person as bytes, UNREACHABLE for people not connected.
+    """
+    distance = bytearray([UNREACHABLE]) * len(graph.person_ids)
+    for level, (frontier, _) in enumerate(levels(graph, source)):
+        level = min(level, UNREACHABLE - 1)
+        for person in frontier:
+            distance[person] = level
+    return distance
+
+
+def load_index(directory, graph, count, cache=True):
+    """
+    Returns the landmark index of the graph loaded from directory,
+    reading it from the index file next to the CSV files if it is fresh
+    and has count landmarks, otherwise building and writing it.
+    """
+    path = os.path.join(directory, FILENAME)
+    key = csv_key(directory)
+    if cache:
+        index = read(path, key, graph)
+        if index is not None and len(index.landmarks) == count:
+            return index
+
+    index = LandmarkIndex.build(graph, count)
+    if cache:
+        try:
+            write(index, path, key)
+        except OSError:
+            pass
+    return index
+
+
+def write(index, path, key):
+    """
+    Writes the index to path, replacing it atomically.
+    """
+    header = {"key": key, "people": len(index.graph.person_ids),
+              "count": len(index.landmarks)}
+    chunks = [memoryview(index.landmarks).cast("B")] + list(index.distances)
+    write_file(path, MAGIC, VERSION, header, chunks)
+
+
+def read(path, key, graph):
+    """
+    Memory-maps the index at path, or returns None if it is missing or stale.
+    """
+    mapped = read_file(path, MAGIC, VERSION, key)
+    if mapped is None:
+        return None
+    header, view, position = mapped
+    people = len(graph.person_ids)
+    if header["people"] != people:
+        return None
+
+    count = header["count"]
+    landmarks = view[position:position + 4 * count].cast("i")
+    position += 4 * count
+    distances = []
+    for _ in range(count):
+        distances.append(view[position:position + people])
+        position += people
+    return LandmarkIndex(graph, landmarks, distances)
+
+
+def main():
+    # Imported here, degrees imports this module for its landmark index
+    from degrees import search
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build the index and report its cost")
+    build.add_argument("directory")
+    build.add_argument("--count", type=int, default=16)
+    report = commands.add_parser(
+        "report", help="compare queries with and without the index")
+    report.add_argument("directory")
+    report.add_argument("--count", type=int, default=16)
+    report.add_argument("--queries", type=int, default=200)
+    report.add_argument("--seed", type=int, default=50)
+    args = parser.parse_args()
+
+    graph = load_graph(args.directory)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        index = LandmarkIndex.build(graph, args.count)
+        elapsed = time.perf_counter() - start
+        write(index, os.path.join(args.directory, FILENAME), csv_key(args.directory))
+        size = os.path.getsize(os.path.join(args.directory, FILENAME))
+        print(f"Built {args.count} landmarks over {len(graph.person_ids)} people "
+              f"in {elapsed:.2f}s, index is {size / 2 ** 20:.1f} MiB.")
+        return
+
+    index = load_index(args.directory, graph, args.count)
+    rng = random.Random(args.seed)
+    people = len(graph.person_ids)
+    pairs = [(rng.randrange(people), rng.randrange(people)) for _ in range(args.queries)]
+
+    plain = SearchStats()
+    indexed = SearchStats()
+    times = [0.0, 0.0]
+    unconnected = exact = 0
+    for source, target in pairs:
+        start = time.perf_counter()
+        expected = search(source, target, graph.neighbors, plain)
+        times[0] += time.perf_counter() - start
+        start = time.perf_counter()
+        path = index.shortest_path(source, target, search, indexed)
+        times[1] += time.perf_counter() - start
+        if (path is None) != (expected is None) or (
+            path is not None and len(path) != len(expected)
+        ):
+            sys.exit(f"The index disagrees with the search on {source} -> {target}")
+
+        lower, upper = index.bounds(source, target)
+        if lower is None:
+            unconnected += 1
+        elif lower == upper:
+            exact += 1
+
+    print(f"{args.queries} queries with {len(index.landmarks)} landmarks")
+    for name, stats, seconds in [("bidirectional search", plain, times[0]),
+                                 ("with the index", indexed, times[1])]:
+        print(f"    {name}: {stats.expanded / args.queries:.1f} people expanded "
+              f"per query, {seconds:.3f}s")
+    print(f"    answered by the bounds alone: {unconnected} not connected, "
+          f"{exact} exact")
+
+
+if __name__ == "__main__":
+    main()
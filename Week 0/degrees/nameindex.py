@@ -0,0 +1,200 @@
+"""
+Prefix and fuzzy lookup of person names.
+
+Names are looked up among the sorted, distinct, lowercase names: a prefix
+is a binary search over them, and fuzzy matches come from a trigram index,
+in CSR form like the graph, mapping each trigram (hashed into a fixed number
+of buckets, so ids are stable across runs) to the names that contain it.
+"""
+import difflib
+import zlib
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+# Trigrams are hashed into this many buckets
+BUCKETS = 1 << 18
+
+# Trigrams in more names than this share are only used when a query has
+# nothing rarer, so common ones like " jo" never scan most of the index
+COMMON = 0.02
+
+# Candidates by trigram overlap that get the slower, exact similarity
+RERANK = 20
+
+
+class NameIndex():
+    """
+    Prefix and fuzzy search over sorted distinct lowercase names.
+    """
+
+    def __init__(self, keys, gram_offsets, grams):
+        self.keys = keys
+        self.gram_offsets = gram_offsets
+        self.grams = grams
+        # Names added after the index was built: for membership, sorted for
+        # prefixes, and by id (len(keys) onwards) with trigram postings of
+        # their own, merged with the built ones when searching
+        self.extra = set()
+        self.extra_sorted = []
+        self.extra_names = []
+        self.extra_grams = {}
+
+    @classmethod
+    def build(cls, keys):
+        """
+        Builds the trigram index of keys, a sorted sequence of distinct names.
+        """
+        gram_offsets, grams = build_grams(keys)
+        return cls(keys, gram_offsets, grams)
+
+    def add(self, name):
+        """
+        Makes a name added after the index was built searchable.
+        """
+        name = name.lower()
+        i = bisect_left(self.keys, name)
+        if (i < len(self.keys) and self.keys[i] == name) or name in self.extra:
+            return
+        key = len(self.keys) + len(self.extra_names)
+        self.extra.add(name)
+        self.extra_names.append(name)
+        insort(self.extra_sorted, name)
+        for bucket in {gram_bucket(gram) for gram in trigrams(name)}:
+            self.extra_grams.setdefault(bucket, []).append(key)
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to limit names starting with prefix, in sorted order.
+        """
+        prefix = prefix.lower()
+        matches = []
+        for keys in [self.keys, self.extra_sorted]:
+            i = bisect_left(keys, prefix)
+            end = min(len(keys), i + limit)
+            while i < end and keys[i].startswith(prefix):
+                matches.append(keys[i])
+                i += 1
+        return sorted(matches)[:limit]
+
+    def fuzzy(self, name, limit=10):
+        """
+        Returns up to limit (name, similarity) pairs for the names closest
+        to name, most similar first, similarity going from 0 to 1.
+        """
+        name = name.lower()
+        buckets = {gram_bucket(gram) for gram in trigrams(name)}
+        if not buckets:
+            return []
+
+        # Rare trigrams first, common ones only if nothing rarer matched
+        extra_grams = self.extra_grams
+        postings = sorted((self.gram_offsets[b + 1] - self.gram_offsets[b]
+                           + len(extra_grams.get(b, ())), b)
+                          for b in buckets)
+        common = max(1, int(COMMON * (len(self.keys) + len(self.extra_names))))
+        shared = Counter()
+        for size, bucket in postings:
+            if size > common and shared:
+                break
+            shared.update(self.grams[
+                self.gram_offsets[bucket]:self.gram_offsets[bucket + 1]])
+            if bucket in extra_grams:
+                shared.update(extra_grams[bucket])
+
+        # The most shared trigrams pick the candidates, then the similarity
+        # of the whole strings orders them
+        base = len(self.keys)
+        names = [self.keys[key] if key < base else self.extra_names[key - base]
+                 for key, _ in shared.most_common(RERANK)]
+
+        matcher = difflib.SequenceMatcher(b=name, autojunk=False)
+        scored = []
+        for candidate in names:
+            matcher.set_seq1(candidate)
+            scored.append((matcher.ratio(), candidate))
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [(candidate, score) for score, candidate in scored[:limit]]
+
+    def suggest(self, name, limit=10):
+        """
+        Returns up to limit names for what may be a partial or misspelled name:
+        the names starting with it if there are any, otherwise the closest ones.
+        """
+        return self.prefix(name, limit) or [
+            candidate for candidate, _ in self.fuzzy(name, limit)]
+
+    def nbytes(self):
+        """
+        Returns the number of bytes of the trigram index.
+        """
+        return (len(self.gram_offsets) * self.gram_offsets.itemsize
+                + len(self.grams) * self.grams.itemsize)
+
+
+class UniqueNames():
+    """
+    Sorted distinct lowercase names of a graph, from the positions in its
+    sorted names where a new name starts.
+    """
+
+    def __init__(self, graph, starts):
+        self.graph = graph
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        return self.graph.person_name_keys[self.starts[i]]
+
+
+def name_starts(sorted_names):
+    """
+    Returns the positions in sorted_names where a new name starts.
+    """
+    starts = array("i")
+    previous = None
+    for i, name in enumerate(sorted_names):
+        if name != previous:
+            starts.append(i)
+        previous = name
+    return starts
+
+
+def trigrams(name):
+    """
+    Returns the trigrams of a name padded with a space on each side.
+    """
+    padded = f" {name} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def gram_bucket(gram):
+    """
+    Returns the bucket of a trigram, the same in every process.
+    """
+    return zlib.crc32(gram.encode("utf-8")) % BUCKETS
+
+
+def build_grams(keys):
+    """
+    Returns the CSR offsets and postings mapping trigram buckets
+    to the positions of the keys containing them.
+    """
+    # Two passes over the keys, hashing twice rather than holding
+    # the buckets of every key in memory
+    counts = array("q", bytes(8 * (BUCKETS + 1)))
+    for key in keys:
+        for bucket in {gram_bucket(gram) for gram in trigrams(key)}:
+            counts[bucket + 1] += 1
+    for i in range(BUCKETS):
+        counts[i + 1] += counts[i]
+
+    position = array("q", counts)
+    grams = array("i", bytes(4 * counts[BUCKETS]))
+    for i, key in enumerate(keys):
+        for bucket in {gram_bucket(gram) for gram in trigrams(key)}:
+            grams[position[bucket]] = i
+            position[bucket] += 1
+    return counts, grams
@@ -0,0 +1,318 @@
+"""
+Enumeration of many paths between two people.
+
+Everything here works on any kind of person id, given neighbors(person)
+returning (movie, person) pairs, so it runs on both stores of degrees.py.
+Paths are lists of (movie, person) pairs, like shortest_path returns.
+"""
+import functools
+import heapq
+import itertools
+from collections import OrderedDict
+
+# Shortest paths of a spur search tried for one that does not take
+# the same movie twice in a row
+SPUR_PATHS = 100
+
+
+class ShortestPathDag():
+    """
+    Every shortest path between source and target, as the parents of each
+    person on them towards the source (forward) and towards the target
+    (backward), split at the level where the two searches met.
+    """
+
+    def __init__(self, source, target, meetings, forward, backward):
+        self.source = source
+        self.target = target
+        self.meetings = meetings
+        self.forward = forward
+        self.backward = backward
+
+    def __len__(self):
+        """
+        Size of the DAG, the number of parent links it keeps.
+        """
+        return (sum(len(parents) for parents in self.forward.values() if parents)
+                + sum(len(parents) for parents in self.backward.values() if parents))
+
+    def reversed(self):
+        """
+        Returns the DAG of the same paths from target to source.
+        """
+        return ShortestPathDag(self.target, self.source, self.meetings,
+                               self.backward, self.forward)
+
+    def paths(self):
+        """
+        Yields every shortest path, one at a time.
+        """
+        for meeting in self.meetings:
+            for prefix in paths_to(meeting, self.forward):
+                for suffix in paths_from(meeting, self.backward):
+                    yield prefix + suffix
+
+
+def shortest_path_dag(source, target, neighbors, stats=None):
+    """
+    Bidirectional breadth-first search keeping every parent on the previous
+    level of each person, instead of only the first one found.
+
+    Returns the ShortestPathDag, or None if the two are not connected.
+    If stats is a SearchStats, what the search did is counted into it.
+    """
+    if source == target:
+        return ShortestPathDag(source, target, [source],
+                               {source: None}, {target: None})
+
+    if stats is not None:
+        neighbors = stats.counting(neighbors)
+
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        if stats is not None:
+            stats.frontier(len(forward_frontier) + len(backward_frontier))
+
+        # Always grow the smaller side, and always finish the whole level,
+        # so that every meeting person on it is found
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meetings = expand_all(
+                forward_frontier, forward, backward, neighbors)
+        else:
+            backward_frontier, meetings = expand_all(
+                backward_frontier, backward, forward, neighbors)
+
+        if meetings:
+            if stats is not None:
+                stats.discovered += len(forward) + len(backward)
+            return ShortestPathDag(source, target, meetings,
+                                   prune(meetings, forward),
+                                   prune(meetings, backward))
+
+    if stats is not None:
+        stats.discovered += len(forward) + len(backward)
+    return None
+
+
+def expand_all(frontier, parents, other_parents, neighbors):
+    """
+    Expands one whole level, recording every parent of each new person.
+
+    Returns the next level and the people on it found by the other side.
+    """
+    level = {}
+    for person in frontier:
+        for movie, neighbor in neighbors(person):
+            if neighbor in level:
+                level[neighbor].append((movie, person))
+            elif neighbor not in parents:
+                level[neighbor] = [(movie, person)]
+
+    parents.update(level)
+    meetings = [person for person in level if person in other_parents]
+    return list(level), meetings
+
+
+def prune(meetings, parents):
+    """
+    Keeps only the parents of people on a path to one of the meetings.
+    """
+    kept = {}
+    stack = list(meetings)
+    while stack:
+        person = stack.pop()
+        if person in kept:
+            continue
+        kept[person] = parents[person]
+        if parents[person] is not None:
+            stack.extend(parent for _, parent in parents[person])
+    return kept
+
+
+def paths_to(person, parents):
+    """
+    Yields every path from the root of parents to person.
+    """
+    if parents[person] is None:
+        yield []
+        return
+    for movie, parent in parents[person]:
+        for prefix in paths_to(parent, parents):
+            yield prefix + [(movie, person)]
+
+
+def paths_from(person, parents):
+    """
+    Yields every path from person to the root of parents.
+    """
+    if parents[person] is None:
+        yield []
+        return
+    for movie, parent in parents[person]:
+        for suffix in paths_from(parent, parents):
+            yield [(movie, parent)] + suffix
+
+
+def k_shortest_paths(source, target, k, neighbors, stats=None):
+    """
+    Returns up to k shortest paths without repeated people,
+    shortest first, with Yen's algorithm.
+
+    Every movie connects all of its stars to each other, so a path taking
+    the same movie twice in a row is only the shorter path through that
+    movie with a co-star stopped at, and is never returned.
+    If stats is a SearchStats, every search it runs is counted into it.
+    """
+    dag = shortest_path_dag(source, target, neighbors, stats)
+    if dag is None or k < 1:
+        return []
+    found = [next(dag.paths())]
+    if source == target:
+        return found
+
+    # Candidates are (length, order found, path), the order breaking ties
+    candidates = []
+    seen = {tuple(found[0])}
+    counter = itertools.count()
+
+    while len(found) < k:
+        previous = found[-1]
+        people = [source] + [person for _, person in previous]
+
+        # Branch off the previous path at every person along it
+        for i in range(len(previous)):
+            spur = people[i]
+            root = previous[:i]
+
+            # Steps already taken from this root, in either direction
+            banned_steps = set()
+            for path in found:
+                if path[:i] == root:
+                    movie, person = path[i]
+                    banned_steps.add((spur, movie, person))
+                    banned_steps.add((person, movie, spur))
+            banned_people = set(people[:i])
+            # Nor can the spur go on with the movie that led to it
+            last_movie = root[-1][0] if root else None
+
+            spur_dag = shortest_path_dag(
+                spur, target,
+                functools.partial(spur_neighbors, neighbors, spur, last_movie,
+                                  banned_people, banned_steps),
+                stats)
+            if spur_dag is None:
+                continue
+            path = next((root + spur_path for spur_path in
+                         itertools.islice(spur_dag.paths(), SPUR_PATHS)
+                         if not repeats_movie(spur_path)), None)
+            if path is not None and tuple(path) not in seen:
+                seen.add(tuple(path))
+                heapq.heappush(candidates, (len(path), next(counter), path))
+
+        if not candidates:
+            break
+        found.append(heapq.heappop(candidates)[2])
+
+    return found
+
+
+def spur_neighbors(neighbors, spur, last_movie, banned_people, banned_steps, person):
+    """
+    Returns the (movie, person) pairs next to person that a spur search
+    may take, leaving out the banned people and steps, and the last movie
+    of the root at the spur whichever side of the search reaches it.
+    """
+    return [(movie, neighbor) for movie, neighbor in neighbors(person)
+            if neighbor not in banned_people
+            and (person, movie, neighbor) not in banned_steps
+            and not (movie == last_movie and spur in (person, neighbor))]
+
+
+def repeats_movie(path):
+    """
+    Returns whether the path takes the same movie twice in a row.
+    """
+    return any(path[i][0] == path[i + 1][0] for i in range(len(path) - 1))
+
+
+def reverse_path(path, source):
+    """
+    Returns the path from source the other way round,
+    from its last person back to source.
+    """
+    people = [source] + [person for _, person in path]
+    return [(path[i][0], people[i]) for i in range(len(path) - 1, -1, -1)]
+
+
+class PathCache():
+    """
+    Least recently used cache of path results, bounded by the total size
+    of the results it holds rather than by their number.
+    """
+
+    def __init__(self, max_size=1_000_000):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, keys, usable=None):
+        """
+        Returns the first of keys cached with a value that usable accepts,
+        and that value, or (None, None), counting one hit or miss.
+        """
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is None or (usable is not None and not usable(entry[0])):
+                continue
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return key, entry[0]
+        self.misses += 1
+        return None, None
+
+    def put(self, key, value, size):
+        """
+        Caches value under key, evicting the least recently used entries
+        until everything fits, and skipping values too big to ever fit.
+        """
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+        if size > self.max_size:
+            return
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def invalidate(self, keep):
+        """
+        Drops every entry except those for which keep(key, value) is true.
+        """
+        for key in list(self.entries):
+            value, size = self.entries[key]
+            if not keep(key, value):
+                del self.entries[key]
+                self.size -= size
+
+    def stats(self):
+        """
+        Returns the hit and miss counters and how full the cache is.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "size": self.size,
+            "max_size": self.max_size
+        }
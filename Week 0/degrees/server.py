@@ -0,0 +1,105 @@
+"""
+Long-lived degrees server keeping the graph loaded between queries.
+
+Clients connect over a unix socket (or TCP with --port) and send one JSON
+object per line, {"source": name, "target": name}, and get back one JSON
+line per query, in the format of degrees.answer, with the "stats" of the
+search too if the query also has "stats": true. Queries from every
+connection are answered concurrently by a pool of forked processes,
+which share the loaded, read-only graph with the server instead of
+receiving a pickled copy of it.
+
+    python server.py large --socket /tmp/degrees.sock
+    printf '{"source": "Kevin Bacon", "target": "Tom Hanks"}\n' | nc -U /tmp/degrees.sock
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--socket", default="degrees.sock",
+                        help="path of the unix socket to listen on")
+    parser.add_argument("--port", type=int,
+                        help="listen on this TCP port of localhost instead")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes answering queries")
+    parser.add_argument("--dict", action="store_true",
+                        help="load into plain dicts instead of the compact store")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=not args.dict)
+    print("Data loaded.")
+
+    # The data must be loaded before the workers fork, so they all inherit it
+    pool = ProcessPoolExecutor(args.workers,
+                               mp_context=multiprocessing.get_context("fork"))
+    for future in [pool.submit(os.getpid) for _ in range(args.workers)]:
+        future.result()
+
+    try:
+        asyncio.run(serve(pool, args.socket, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+async def serve(pool, socket_path, port):
+    """
+    Accepts connections until cancelled.
+    """
+    async def handle(reader, writer):
+        await handle_connection(pool, reader, writer)
+
+    if port is not None:
+        server = await asyncio.start_server(handle, "127.0.0.1", port)
+        print(f"Listening on 127.0.0.1:{port}")
+    else:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(handle, socket_path)
+        print(f"Listening on {socket_path}")
+
+    async with server:
+        await server.serve_forever()
+
+
+async def handle_connection(pool, reader, writer):
+    """
+    Answers every query of one connection in order, while queries of
+    other connections keep being answered in the meantime.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        while line := await reader.readline():
+            if not line.strip():
+                continue
+            try:
+                query = json.loads(line)
+                source, target = str(query["source"]), str(query["target"])
+                stats = bool(query.get("stats", False))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                result = {"error": "expected {\"source\": ..., \"target\": ...}"}
+            else:
+                result = await loop.run_in_executor(
+                    pool, degrees.answer, source, target, stats)
+            writer.write(json.dumps(result).encode("utf-8") + b"\n")
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    main()
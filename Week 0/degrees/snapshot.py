@@ -0,0 +1,272 @@
+"""
+Binary snapshot cache of the compact graph.
+
+The snapshot is written next to the CSV files and memory-mapped on later
+runs, so no CSV parsing happens while it is fresh. It is keyed by the size
+and modification time of each CSV, and ignored (then rewritten) as soon as
+any of them changes or the format version does not match.
+
+Layout: an 8 byte magic, a little header of version and header length,
+a JSON header describing every column, then the columns themselves,
+each starting on an 8 byte boundary.
+
+Rows ingested later (see ingest.py) are appended to a journal next to the
+snapshot, one JSON line per delta with the CSV key after it, and replayed
+on top of the mapped snapshot while the journal still matches the CSVs.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+
+from graph import Graph, StringTable
+
+MAGIC = b"DEGREES\0"
+VERSION = 2
+FILENAME = "degrees.snapshot"
+JOURNAL = "degrees.journal"
+CSV_FILES = ["people.csv", "movies.csv", "stars.csv"]
+
+# The journal is folded into a new snapshot once it holds this many
+# stars rows for every one in the snapshot
+MAX_JOURNAL_FRACTION = 0.1
+
+# Version and header length after the magic
+PREAMBLE = struct.Struct("<II")
+
+STRING_COLUMNS = [
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years"
+]
+ARRAY_COLUMNS = [
+    "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+    "person_id_order", "person_name_order", "movie_id_order",
+    "name_starts", "name_gram_offsets", "name_grams"
+]
+
+
+def load_graph(directory, cache=True):
+    """
+    Returns the graph of the CSV files in directory, from the snapshot
+    if it is fresh, otherwise from the CSV files, refreshing the snapshot.
+    """
+    path = os.path.join(directory, FILENAME)
+    key = csv_key(directory)
+    if cache:
+        graph = read(path, key)
+        if graph is None:
+            graph = replay_journal(directory, key)
+        if graph is not None:
+            return graph
+
+    graph = Graph.from_csv(directory)
+    if cache:
+        try:
+            write(graph, path, key)
+            if os.path.exists(os.path.join(directory, JOURNAL)):
+                os.remove(os.path.join(directory, JOURNAL))
+        except OSError:
+            # A read-only data directory just means no cache
+            pass
+    return graph
+
+
+def replay_journal(directory, key):
+    """
+    Returns the graph of the snapshot with every journaled delta applied,
+    or None if the journal does not lead from the snapshot to the CSV files
+    as they are now, or has grown too big to be worth replaying.
+    """
+    entries = read_journal(directory)
+    if len(entries) < 2 or entries[-1]["key"] != key:
+        return None
+    graph = read(os.path.join(directory, FILENAME), entries[0]["key"])
+    if graph is None:
+        return None
+
+    stars = sum(len(entry["rows"].get("stars", [])) for entry in entries[1:])
+    if stars > MAX_JOURNAL_FRACTION * len(graph.movie_stars):
+        return None
+    for entry in entries[1:]:
+        graph.extend(entry["rows"])
+    return graph
+
+
+def read_journal(directory):
+    """
+    Returns the entries of the journal, the first one being the key of
+    the snapshot it starts from, or an empty list if there is none.
+    """
+    try:
+        with open(os.path.join(directory, JOURNAL), encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        return []
+
+
+def record_delta(directory, rows, old_key, new_key):
+    """
+    Appends a delta that took the CSV files from old_key to new_key
+    to the journal, so the snapshot stays usable without a rebuild.
+    """
+    path = os.path.join(directory, JOURNAL)
+    entries = read_journal(directory)
+    if entries and entries[-1]["key"] != old_key:
+        entries = []
+
+    # A journal can only start from a snapshot of the CSV files before the delta
+    if not entries:
+        if read(os.path.join(directory, FILENAME), old_key) is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"key": old_key}) + "\n")
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"key": new_key, "rows": rows}) + "\n")
+
+
+def csv_key(directory):
+    """
+    Returns the size and modification time of every CSV file.
+    """
+    key = {}
+    for filename in CSV_FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        key[filename] = [stat.st_size, stat.st_mtime_ns]
+    return key
+
+
+def columns_of(graph):
+    """
+    Returns every column of the graph by name.
+    """
+    return {name: getattr(graph, name) for name in STRING_COLUMNS + ARRAY_COLUMNS}
+
+
+def write(graph, path, key):
+    """
+    Writes the graph to a snapshot at path, replacing it atomically.
+    """
+    if (graph.extra_movies or len(graph.person_ids) > graph.base_people
+            or len(graph.movie_ids) > graph.base_movies):
+        raise ValueError("rows added by extend are kept in the journal")
+
+    # Every string column is stored as its blob followed by its offsets
+    sections = []
+    for name, column in columns_of(graph).items():
+        if name in STRING_COLUMNS:
+            sections.append((f"{name}.blob", column.blob))
+            sections.append((f"{name}.offsets", column.offsets))
+        else:
+            sections.append((name, column))
+
+    # Offsets in the header are relative to the end of the header
+    layout = {}
+    position = 0
+    for name, data in sections:
+        data = memoryview(data)
+        layout[name] = {"typecode": data.format, "offset": position,
+                        "size": data.nbytes}
+        position += align(data.nbytes)
+
+    def chunks():
+        for _, data in sections:
+            data = memoryview(data).cast("B")
+            yield data
+            yield b"\0" * (align(len(data)) - len(data))
+
+    write_file(path, MAGIC, VERSION, {"key": key, "sections": layout}, chunks())
+
+
+def read(path, key):
+    """
+    Memory-maps the snapshot at path and returns its graph,
+    or None if it is missing, corrupt or stale for the key.
+    """
+    mapped = read_file(path, MAGIC, VERSION, key)
+    if mapped is None:
+        return None
+    header, view, base = mapped
+
+    # Every column is a zero-copy view into the mapped file
+    sections = {}
+    for name, section in header["sections"].items():
+        begin = base + section["offset"]
+        sections[name] = view[begin:begin + section["size"]].cast(
+            section["typecode"])
+
+    columns = {}
+    for name in STRING_COLUMNS:
+        columns[name] = StringTable(
+            sections[f"{name}.blob"], sections[f"{name}.offsets"])
+    for name in ARRAY_COLUMNS:
+        columns[name] = sections[name]
+    return Graph(columns)
+
+
+def write_file(path, magic, version, header, chunks):
+    """
+    Writes a file of magic, version, the JSON header with the byte order
+    added, and then the chunks of data, replacing path atomically.
+    The data starts on an 8 byte boundary.
+    """
+    header = json.dumps(dict(header, byteorder=sys.byteorder)).encode("utf-8")
+    header += b" " * (align(len(magic) + PREAMBLE.size + len(header))
+                      - len(magic) - PREAMBLE.size - len(header))
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(magic)
+            f.write(PREAMBLE.pack(version, len(header)))
+            f.write(header)
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def read_file(path, magic, version, key):
+    """
+    Memory-maps a file written by write_file and returns its header,
+    a memoryview of the whole file and where the data starts, or None
+    if it is missing, corrupt, of another version or stale for the key.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    start = len(magic) + PREAMBLE.size
+    if len(data) < start or data[:len(magic)] != magic:
+        return None
+    file_version, header_size = PREAMBLE.unpack_from(data, len(magic))
+    if file_version != version:
+        return None
+    try:
+        header = json.loads(bytes(data[start:start + header_size]))
+    except ValueError:
+        return None
+    if header.get("key") != key or header.get("byteorder") != sys.byteorder:
+        return None
+    return header, memoryview(data), start + header_size
+
+
+def align(size):
+    """
+    Rounds size up to a multiple of 8.
+    """
+    return (size + 7) // 8 * 8
+
+
+if __name__ == "__main__":
+    # Building the snapshot ahead of time, e.g. python snapshot.py large
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python snapshot.py directory")
+    load_graph(sys.argv[1])
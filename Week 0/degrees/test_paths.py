@@ -0,0 +1,133 @@
+"""
+Checks of the path searches of degrees.py on a tiny graph, with both stores.
+
+    python -m unittest test_paths
+"""
+import csv
+import os
+import tempfile
+import unittest
+
+import degrees
+import paths
+
+# Person 1 reaches 5 through 2 or 3, which share movie 1 with it. Movie 6
+# gives 2 more co-stars so that the spur searches from 2 grow backwards
+# from the target, and 6 and 7 are not connected to anyone.
+PEOPLE = ["1", "2", "3", "4", "5", "6", "7", "8", "9"]
+MOVIES = {
+    "1": ["1", "2", "3"],
+    "2": ["3", "4"],
+    "3": ["2", "4"],
+    "4": ["4", "5"],
+    "5": ["6"],
+    "6": ["2", "8", "9"]
+}
+
+
+def write_fixture(directory):
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person_id in PEOPLE:
+            writer.writerow([person_id, f"Person {person_id}", "1970"])
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie_id in MOVIES:
+            writer.writerow([movie_id, f"Movie {movie_id}", "2000"])
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie_id, stars in MOVIES.items():
+            for person_id in stars:
+                writer.writerow([person_id, movie_id])
+
+
+class PathsTest():
+    """
+    The checks, run once per store by the subclasses below.
+    """
+    compact = False
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        write_fixture(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        degrees.load_data(self.directory.name, self.compact, cache=False)
+
+    def assertPath(self, source, target, path):
+        # Every step is a movie both people starred in
+        person = source
+        for movie, next_person in path:
+            self.assertIn(person, MOVIES[movie])
+            self.assertIn(next_person, MOVIES[movie])
+            person = next_person
+        self.assertEqual(person, target)
+
+    def test_shortest_path(self):
+        path = degrees.shortest_path("1", "5")
+        self.assertEqual(len(path), 3)
+        self.assertPath("1", "5", path)
+        self.assertEqual(degrees.shortest_path("1", "3"), [("1", "3")])
+
+    def test_not_connected(self):
+        self.assertIsNone(degrees.shortest_path("1", "6"))
+        self.assertEqual(list(degrees.all_shortest_paths("1", "7")), [])
+        self.assertEqual(degrees.k_shortest_paths("6", "1", 3), [])
+
+    def test_same_person(self):
+        self.assertEqual(degrees.shortest_path("4", "4"), [])
+        self.assertEqual(list(degrees.all_shortest_paths("4", "4")), [[]])
+        # A second time, from the cache
+        self.assertEqual(list(degrees.all_shortest_paths("4", "4")), [[]])
+        self.assertEqual(degrees.k_shortest_paths("4", "4", 3), [[]])
+
+    def test_all_shortest_paths(self):
+        expected = [[("1", "2"), ("3", "4"), ("4", "5")],
+                    [("1", "3"), ("2", "4"), ("4", "5")]]
+        self.assertEqual(sorted(degrees.all_shortest_paths("1", "5")), expected)
+        # The reversed pair is served from the same cache entry
+        reversed_paths = [paths.reverse_path(path, "1") for path in expected]
+        self.assertEqual(sorted(degrees.all_shortest_paths("5", "1")),
+                         sorted(reversed_paths))
+
+    def test_k_shortest_paths(self):
+        found = degrees.k_shortest_paths("1", "5", 5)
+        # Going 1, 2, 3 through movie 1 is only 1 to 3 with a stop at 2,
+        # so the two shortest paths are all there is
+        self.assertEqual(sorted(found), sorted(degrees.all_shortest_paths("1", "5")))
+        for path in found:
+            self.assertPath("1", "5", path)
+            self.assertFalse(paths.repeats_movie(path))
+        self.assertEqual(degrees.k_shortest_paths("1", "5", 1), found[:1])
+
+    def test_k_shortest_paths_never_repeat_a_movie(self):
+        for source in PEOPLE:
+            for target in PEOPLE:
+                found = degrees.k_shortest_paths(source, target, 10)
+                self.assertEqual([len(path) for path in found],
+                                 sorted(len(path) for path in found))
+                for path in found:
+                    self.assertPath(source, target, path)
+                    self.assertFalse(paths.repeats_movie(path), (source, target, path))
+                    people = [source] + [person for _, person in path]
+                    self.assertEqual(len(set(people)), len(people))
+
+
+class DictPathsTest(PathsTest, unittest.TestCase):
+    compact = False
+
+
+class CompactPathsTest(PathsTest, unittest.TestCase):
+    compact = True
+
+
+if __name__ == "__main__":
+    unittest.main()
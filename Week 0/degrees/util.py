@@ -1,4 +1,17 @@
+import contextlib
+import cProfile
+import heapq
+import itertools
+import pstats
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+
 class Node():
+    __slots__ = ("state", "parent", "action")
+
     def __init__(self, state, parent, action):
         self.state = state
         self.parent = parent
@@ -8,31 +21,165 @@ class Node():
 class StackFrontier():
     def __init__(self):
         self.frontier = []
+        # Number of nodes in the frontier for every state, for contains_state
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
 
+    def __len__(self):
+        return len(self.frontier)
+
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.pop()
+            self.discard(node.state)
             return node
 
+    def pop(self):
+        return self.frontier.pop()
+
+    def discard(self, state):
+        count = self.states[state]
+        if count == 1:
+            del self.states[state]
+        else:
+            self.states[state] = count - 1
+
 
 class QueueFrontier(StackFrontier):
+    def __init__(self):
+        super().__init__()
+        self.frontier = deque()
 
-    def remove(self):
+    def pop(self):
+        return self.frontier.popleft()
+
+
+class PriorityFrontier(StackFrontier):
+    """
+    Frontier removing the node with the lowest priority first,
+    and the earliest added among equal priorities,
+    e.g. path cost for uniform-cost search or cost plus heuristic for A*.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Entries are (priority, order added, node), the order breaking ties
+        # so that nodes themselves are never compared
+        self.counter = itertools.count()
+
+    def add(self, node, priority=0):
+        heapq.heappush(self.frontier, (priority, next(self.counter), node))
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def pop(self):
+        return heapq.heappop(self.frontier)[2]
+
+    def peek_priority(self):
         if self.empty():
             raise Exception("empty frontier")
-        else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+        return self.frontier[0][0]
+
+
+class SearchStats():
+    """
+    What one search did, filled in by any search given it as stats:
+    people expanded, edges scanned, the peak size of the frontier,
+    and with measure, the wall time and peak memory allocated.
+    """
+    __slots__ = ("expanded", "edges", "frontier_peak", "discovered",
+                 "seconds", "memory_peak", "trace_memory")
+
+    def __init__(self, trace_memory=False):
+        self.expanded = 0
+        self.edges = 0
+        self.frontier_peak = 0
+        self.discovered = 0
+        self.seconds = None
+        self.memory_peak = None
+        self.trace_memory = trace_memory
+
+    def counting(self, neighbors):
+        """
+        Wraps a neighbors function so that every call counts as one state
+        expanded and every pair it yields as one edge scanned.
+        """
+        def counted(state):
+            self.expanded += 1
+            for pair in neighbors(state):
+                self.edges += 1
+                yield pair
+        return counted
+
+    def frontier(self, size):
+        if size > self.frontier_peak:
+            self.frontier_peak = size
+
+    @contextlib.contextmanager
+    def measure(self):
+        """
+        Times the block, and with trace_memory, records the peak memory it
+        allocated, which slows everything down a lot while tracing.
+        """
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.seconds = time.perf_counter() - start
+            if self.trace_memory:
+                self.memory_peak = tracemalloc.get_traced_memory()[1] - baseline
+            if tracing:
+                tracemalloc.stop()
+
+    def as_dict(self):
+        return {
+            "expanded": self.expanded,
+            "edges": self.edges,
+            "frontier_peak": self.frontier_peak,
+            "discovered": self.discovered,
+            "seconds": self.seconds,
+            "memory_peak": self.memory_peak
+        }
+
+
+@contextlib.contextmanager
+def profiled(profiler, output=sys.stderr):
+    """
+    Runs the block under "cprofile" or "pyinstrument" (if installed),
+    writing the report to output once it is done.
+    """
+    if profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(25)
+    elif profiler == "pyinstrument":
+        from pyinstrument import Profiler
+        profile = Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            output.write(profile.output_text())
+    else:
+        raise ValueError(f"unknown profiler: {profiler}")
@@ -0,0 +1,233 @@
+"""
+Engines playing tic-tac-toe against each other, without the window.
+
+Every pair of engines plays games with each of them as X in turn, across
+a pool of processes, each game starting with a few random moves so that
+the games differ. The report has every engine's score, an Elo-like rating
+fitted to all the results, and the time and nodes it spent per move.
+
+The engines are minimax with the search alone, with the transposition
+table, from the opening book (python book.py build, otherwise it searches),
+MCTS with a fixed number of playouts per move, and random moves as a
+baseline that the others can be rated against.
+
+    python arena.py --games 20 --workers 4
+    python arena.py --engines table mcts --playouts 50
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import time
+
+# tictactoe before book, which it imports itself
+import tictactoe as ttt
+from book import Book, read
+from mcts import MCTS
+from mnk import Game
+from searchstats import SearchStats
+from transposition import TranspositionTable
+
+ENGINES = ["minimax", "table", "book", "mcts", "random"]
+
+# Rating given to every engine before the games, and the weight of that guess
+# in games, so that an engine that won or lost everything gets a finite rating
+PRIOR_RATING = 0
+PRIOR_GAMES = 1
+
+# The state each engine keeps from move to move, per process
+tables = {}
+searches = {}
+book = Book()
+
+
+def engine_move(engine, board, playouts, rng):
+    """
+    Returns the action engine plays on board and the nodes it searched.
+    """
+    if engine == "random":
+        return rng.choice(sorted(ttt.actions(board))), 0
+
+    if engine == "mcts":
+        if engine not in searches:
+            searches[engine] = MCTS(Game(), playouts=playouts, seed=rng.random())
+        search = searches[engine]
+        cell = search.best_move(*ttt.encode(board))
+        return divmod(cell, 3), search.stats["playouts"]
+
+    # The minimax engines only differ by the table and book the search uses
+    if engine == "table" and engine not in tables:
+        tables[engine] = TranspositionTable()
+    saved = ttt.table, ttt.book, ttt.stats
+    ttt.table = tables.get(engine)
+    ttt.book = book if engine == "book" else None
+    ttt.stats = SearchStats()
+    try:
+        action = ttt.minimax(board)
+        return action, ttt.stats.nodes
+    finally:
+        ttt.table, ttt.book, ttt.stats = saved
+
+
+def play_game(game):
+    """
+    Plays game, a tuple of (X engine, O engine, random opening moves,
+    MCTS playouts, seed), and returns the result as a dict.
+    """
+    first, second, opening, playouts, seed = game
+    rng = random.Random(seed)
+    engines = {ttt.X: first, ttt.O: second}
+    moves = {first: 0, second: 0}
+    seconds = {first: 0.0, second: 0.0}
+    nodes = {first: 0, second: 0}
+
+    board = ttt.initial_state()
+    played = 0
+    while not ttt.terminal(board):
+        if played < opening:
+            action = rng.choice(sorted(ttt.actions(board)))
+        else:
+            engine = engines[ttt.player(board)]
+            start = time.perf_counter()
+            action, searched = engine_move(engine, board, playouts, rng)
+            seconds[engine] += time.perf_counter() - start
+            moves[engine] += 1
+            nodes[engine] += searched
+        board = ttt.result(board, action)
+        played += 1
+
+    return {
+        "x": first,
+        "o": second,
+        "utility": ttt.utility(board),
+        "moves": moves,
+        "seconds": seconds,
+        "nodes": nodes
+    }
+
+
+def schedule(engines, games, opening, playouts, seed=None):
+    """
+    Returns the games to play, games for every ordered pair of engines.
+    """
+    rng = random.Random(seed)
+    return [(first, second, opening, playouts, rng.getrandbits(32))
+            for first, second in itertools.permutations(engines, 2)
+            for _ in range(games)]
+
+
+def run(games, workers=1):
+    """
+    Returns the results of games, see play_game, played by workers processes.
+    """
+    if workers <= 1:
+        return [play_game(game) for game in games]
+    with multiprocessing.Pool(workers) as pool:
+        return list(pool.imap_unordered(play_game, games, chunksize=4))
+
+
+def scores(results):
+    """
+    Returns the points of every engine, 1 for a win and 1/2 for a tie,
+    and the number of games it played.
+    """
+    points, played = {}, {}
+    for result in results:
+        for engine, sign in [(result["x"], 1), (result["o"], -1)]:
+            points[engine] = points.get(engine, 0) + (1 + sign * result["utility"]) / 2
+            played[engine] = played.get(engine, 0) + 1
+    return points, played
+
+
+def ratings(results, iterations=200):
+    """
+    Returns Elo-like ratings that make the expected scores of the engines
+    against the opponents they met match their actual scores, with the
+    average engine at 0.
+    """
+    points, played = scores(results)
+    rating = {engine: 0.0 for engine in played}
+
+    def expected(engine, opponent):
+        return 1 / (1 + 10 ** ((rating[opponent] - rating[engine]) / 400))
+
+    for _ in range(iterations):
+        for engine in rating:
+            total = PRIOR_GAMES / (1 + 10 ** ((PRIOR_RATING - rating[engine]) / 400))
+            for result in results:
+                if result["x"] == engine:
+                    total += expected(engine, result["o"])
+                elif result["o"] == engine:
+                    total += expected(engine, result["x"])
+            actual = points[engine] + PRIOR_GAMES / 2
+            # A step towards the rating whose expected score is the actual one
+            rating[engine] += 400 * (actual - total) / (played[engine] + PRIOR_GAMES)
+        mean = sum(rating.values()) / len(rating)
+        rating = {engine: value - mean for engine, value in rating.items()}
+    return rating
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--games", type=int, default=10,
+                        help="games for every pair of engines and side")
+    parser.add_argument("--random", type=int, default=1,
+                        help="random moves at the start of each game")
+    parser.add_argument("--playouts", type=int, default=200,
+                        help="MCTS playouts per move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    engines = list(dict.fromkeys(args.engines))
+    if len(engines) < 2:
+        parser.error("at least two engines are needed")
+    if "book" in engines and read() is None:
+        print("No opening book, the book engine searches instead (python book.py build)")
+
+    games = schedule(engines, args.games, args.random, args.playouts, args.seed)
+    start = time.perf_counter()
+    results = run(games, args.workers)
+    elapsed = time.perf_counter() - start
+
+    points, played = scores(results)
+    rating = ratings(results)
+    moves = {engine: 0 for engine in engines}
+    seconds = {engine: 0.0 for engine in engines}
+    nodes = {engine: 0 for engine in engines}
+    for result in results:
+        for engine in result["moves"]:
+            moves[engine] += result["moves"][engine]
+            seconds[engine] += result["seconds"][engine]
+            nodes[engine] += result["nodes"][engine]
+
+    print(f"{len(results)} games in {elapsed:.2f}s with {args.workers} workers, "
+          f"{len(results) / elapsed:,.1f} games/s, "
+          f"{sum(moves.values()) / elapsed:,.0f} moves/s")
+    print(f"{'engine':>8} {'score':>7} {'rating':>7} {'ms/move':>8} "
+          f"{'nodes/move':>10} {'nodes/s':>10}")
+    for engine in sorted(engines, key=lambda engine: -rating[engine]):
+        per_move = moves[engine] or 1
+        speed = nodes[engine] / seconds[engine] if seconds[engine] else 0
+        print(f"{engine:>8} {points[engine] / played[engine]:>7.1%} "
+              f"{rating[engine]:>+7.0f} {1000 * seconds[engine] / per_move:>8.3f} "
+              f"{nodes[engine] / per_move:>10,.0f} {speed:>10,.0f}")
+
+    # Wins, ties and losses of every pair, both sides together
+    print()
+    for first, second in itertools.combinations(engines, 2):
+        record = [0, 0, 0]
+        for result in results:
+            if {result["x"], result["o"]} == {first, second}:
+                # 1 if first won, 0 for a tie and -1 if it lost
+                outcome = result["utility"] if result["x"] == first else -result["utility"]
+                record[1 - outcome] += 1
+        print(f"{first} against {second}: {record[0]} won, {record[1]} tied, "
+              f"{record[2]} lost")
+
+
+if __name__ == "__main__":
+    main()
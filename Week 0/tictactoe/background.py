@@ -0,0 +1,125 @@
+"""
+The computer's search for a move, run in a background thread so that
+runner.py keeps drawing the window while it thinks.
+
+The best move found so far and the work done are kept up to date as
+attributes, which the window reads every frame, and the search can be
+told to play its best move right away or be cancelled.
+"""
+import threading
+import time
+
+import tictactoe as ttt
+from mcts import MCTS
+from mnk import Game, Search
+
+# How often MCTS stops to report its best move, in seconds
+MCTS_STEP = 0.05
+
+
+class BackgroundSearch():
+    """
+    Searches for moves with engine, "minimax" or "mcts", under rules,
+    the tictactoe module or an mnk.Game, spending up to budget seconds
+    per move where the engine has a budget.
+    """
+
+    def __init__(self, rules=ttt, engine="minimax", budget=1.0):
+        self.rules = rules
+        self.engine = engine
+        self.budget = budget
+        self.game = Game() if rules is ttt else rules
+        # Kept between moves, so the tree of the last move is reused
+        self.mcts = MCTS(self.game) if engine == "mcts" else None
+        self.search = None
+        self.thread = None
+        self.reset()
+
+    def reset(self):
+        # Progress of the current search, read by the window
+        self.best = None
+        self.nodes = 0
+        self.depth = 0
+        self.started = None
+        self.done = False
+        self.stopped = False
+        self.cancelled = False
+
+    def start(self, board):
+        """
+        Starts searching for a move on board.
+        """
+        # A cancelled search stops within moments, and must not
+        # report into this one
+        if self.thread is not None:
+            self.thread.join()
+        self.reset()
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, args=(board,), daemon=True)
+        self.thread.start()
+
+    def thinking(self):
+        return self.thread is not None and not self.done
+
+    def move(self):
+        """
+        Returns the move once the search is done, otherwise None.
+        """
+        if self.done and not self.cancelled:
+            return self.best
+        return None
+
+    def force(self):
+        """
+        Stops the search, which then plays its best move so far.
+        """
+        self.stopped = True
+        if self.search is not None:
+            self.search.stop()
+
+    def cancel(self):
+        """
+        Stops the search and drops its move.
+        """
+        self.cancelled = True
+        self.force()
+
+    def run(self, board):
+        try:
+            if self.engine == "mcts":
+                self.run_mcts(board)
+            elif self.rules is ttt:
+                # The 3x3 search is over in a moment, there is nothing to report
+                self.best = ttt.minimax(board)
+            else:
+                self.run_search(board)
+        finally:
+            self.done = True
+
+    def run_search(self, board):
+        def progress(depth, best, score, nodes):
+            self.depth = depth
+            self.best = divmod(best, self.game.n)
+            self.nodes = nodes
+
+        self.search = Search(self.game, self.budget, progress=progress)
+        if self.stopped:
+            self.search.stop()
+        cell = self.search.best_move(*self.game.encode(board))
+        self.best = None if cell is None else divmod(cell, self.game.n)
+        self.nodes = self.search.nodes
+
+    def run_mcts(self, board):
+        # Short searches one after the other grow the same tree,
+        # reporting the best move after each of them
+        x, o = self.game.encode(board)
+        deadline = time.perf_counter() + self.budget
+        while True:
+            self.mcts.budget = min(MCTS_STEP, deadline - time.perf_counter())
+            cell = self.mcts.best_move(x, o)
+            if cell is None:
+                return
+            self.best = divmod(cell, self.game.n)
+            self.nodes += self.mcts.stats["playouts"]
+            if self.stopped or time.perf_counter() >= deadline:
+                return
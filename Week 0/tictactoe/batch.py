@@ -0,0 +1,174 @@
+"""
+Tic-tac-toe functions over many boards at once, with NumPy.
+
+A batch of boards is an N x 9 array of int8, one row per board in the
+cell order of the bitmasks, cell (i, j) at column 3 * i + j, with 1 for X,
+-1 for O and 0 for an empty cell. The rows are turned into the (x, o)
+bitmasks of tictactoe.py with one matrix product, and the lines are then
+looked up in its HAS_LINE table for all boards together.
+
+    python batch.py --boards 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+import tictactoe as ttt
+
+# Bit of every cell, to turn rows into bitmasks
+BITS = 1 << np.arange(9, dtype=np.int32)
+
+# Whether a mask contains a line, as an array to index with many masks
+HAS_LINE = np.frombuffer(ttt.HAS_LINE, dtype=np.bool_)
+
+# Base 3 weight of every cell, X counting 1 and O counting 2, as in book.py
+TERNARY = 3 ** np.arange(9, dtype=np.int32)
+
+
+def from_boards(boards):
+    """
+    Returns the batch of a list of boards.
+    """
+    values = {ttt.X: 1, ttt.O: -1, ttt.EMPTY: 0}
+    return np.array([[values[cell] for row in board for cell in row] for board in boards],
+                    dtype=np.int8).reshape(-1, 9)
+
+
+def to_boards(batch):
+    """
+    Returns the boards of a batch as lists, like tictactoe.initial_state.
+    """
+    values = {1: ttt.X, -1: ttt.O, 0: ttt.EMPTY}
+    return [[[values[cell] for cell in row[3 * i:3 * i + 3]] for i in range(3)]
+            for row in batch.tolist()]
+
+
+def encode(batch):
+    """
+    Returns the x and o bitmasks of every board in the batch.
+    """
+    return (batch == 1).astype(np.int32) @ BITS, (batch == -1).astype(np.int32) @ BITS
+
+
+def decode(x, o):
+    """
+    Returns the batch of boards of the x and o bitmasks.
+    """
+    cells = BITS[np.newaxis, :]
+    x, o = np.asarray(x)[:, np.newaxis], np.asarray(o)[:, np.newaxis]
+    return ((x & cells) != 0).astype(np.int8) - ((o & cells) != 0).astype(np.int8)
+
+
+def players(batch):
+    """
+    Returns 1 for every board with X to move and -1 where O is to move.
+    """
+    return np.where(np.count_nonzero(batch, axis=1) % 2 == 0, 1, -1).astype(np.int8)
+
+
+def utility(batch):
+    """
+    Returns 1 for every board X has won, -1 where O has won, 0 otherwise.
+    """
+    x, o = encode(batch)
+    return np.where(HAS_LINE[x], 1, np.where(HAS_LINE[o], -1, 0)).astype(np.int8)
+
+
+# The winners are the utilities, 1 for X and -1 for O
+winners = utility
+
+
+def terminal(batch):
+    """
+    Returns whether the game is over on every board.
+    """
+    x, o = encode(batch)
+    return HAS_LINE[x] | HAS_LINE[o] | ((x | o) == ttt.FULL)
+
+
+def actions(batch):
+    """
+    Returns an N x 9 array of the cells that can be played on every board,
+    none on boards where the game is over.
+    """
+    return (batch == 0) & ~terminal(batch)[:, np.newaxis]
+
+
+def index(batch):
+    """
+    Returns the base 3 number of every board, a key that differs
+    for every board, the same as book.index.
+    """
+    return ((batch == 1).astype(np.int32) @ TERNARY
+            + 2 * ((batch == -1).astype(np.int32) @ TERNARY))
+
+
+def positions(include_terminal=True):
+    """
+    Returns a batch of every position that can be reached from the empty
+    board, one move deeper at a time, in order of the base 3 number
+    within each number of moves.
+    """
+    layer = np.zeros((1, 9), dtype=np.int8)
+    layers = []
+    while len(layer):
+        over = terminal(layer)
+        layers.append(layer if include_terminal else layer[~over])
+
+        # Every legal move on every board of the layer, and then
+        # each board reached by more than one order of moves once
+        layer = layer[~over]
+        boards, cells = np.nonzero(layer == 0)
+        following = layer[boards]
+        following[np.arange(len(boards)), cells] = players(layer)[boards]
+        _, unique = np.unique(index(following), return_index=True)
+        layer = following[unique]
+    return np.concatenate(layers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boards", type=int, default=1_000_000,
+                        help="reachable positions, repeated, to evaluate")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    reachable = positions()
+    print(f"{len(reachable)} reachable positions in {time.perf_counter() - start:.3f}s, "
+          f"{np.count_nonzero(~terminal(reachable))} not over")
+
+    # Checked against the functions of tictactoe.py, board by board
+    boards = to_boards(reachable)
+    values = {ttt.X: 1, ttt.O: -1, None: 0}
+    if (utility(reachable).tolist() != [ttt.utility(board) for board in boards]
+            or terminal(reachable).tolist() != [ttt.terminal(board) for board in boards]
+            or players(reachable).tolist() != [values[ttt.player(board)] for board in boards]):
+        raise SystemExit("The batch functions disagree with tictactoe.py")
+
+    rng = np.random.default_rng(args.seed)
+    batch = reachable[rng.integers(len(reachable), size=args.boards)]
+    start = time.perf_counter()
+    utility(batch)
+    terminal(batch)
+    actions(batch)
+    elapsed = time.perf_counter() - start
+    print(f"    batch: {args.boards:,} boards in {elapsed:.3f}s, "
+          f"{args.boards / elapsed:,.0f} boards/s")
+
+    # The per-board functions, on a sample to keep it short
+    sample = to_boards(batch[:min(len(batch), 100_000)])
+    start = time.perf_counter()
+    for board in sample:
+        ttt.utility(board)
+        ttt.terminal(board)
+        ttt.actions(board)
+    elapsed = time.perf_counter() - start
+    print(f"per board: {len(sample):,} boards in {elapsed:.3f}s, "
+          f"{len(sample) / elapsed:,.0f} boards/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Node throughput of the tic-tac-toe search.
+
+Solves every position after the first move, once with the old
+list-of-lists search, kept here as legacy_find_max and legacy_find_min,
+once with the bitboard search of tictactoe.py, and once more with its
+transposition table, starting empty, and reports the nodes searched per
+second by each, counting the nodes the search would make without a table.
+The bitboard search also runs once more with tictactoe.stats set, for the
+cost of collecting search statistics against leaving them off.
+
+    python benchmark.py --repeat 3
+"""
+import argparse
+import copy
+import time
+
+import tictactoe as ttt
+from searchstats import SearchStats
+from transposition import TranspositionTable
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs of each search, the fastest one is reported")
+    args = parser.parse_args()
+
+    positions = [ttt.result(ttt.initial_state(), action)
+                 for action in ttt.actions(ttt.initial_state())]
+    ttt.table = None
+    nodes = count_nodes(positions)
+
+    def legacy():
+        return [legacy_find_min(board) for board in positions]
+
+    def bitboard():
+        ttt.table = None
+        return [ttt.min_value(*ttt.encode(board)) for board in positions]
+
+    def counted():
+        ttt.table = None
+        ttt.stats = SearchStats()
+        try:
+            return [ttt.min_value(*ttt.encode(board)) for board in positions]
+        finally:
+            ttt.stats = None
+
+    def transposition():
+        ttt.table = TranspositionTable()
+        return [ttt.min_value(*ttt.encode(board)) for board in positions]
+
+    if not legacy() == bitboard() == counted() == transposition():
+        raise SystemExit("The searches disagree")
+
+    print(f"{len(positions)} positions, {nodes} nodes")
+    baseline = None
+    times = {}
+    for name, search in [("lists", legacy), ("bitboards", bitboard),
+                         ("stats on", counted), ("table", transposition)]:
+        elapsed = min(timed(search) for _ in range(args.repeat))
+        times[name] = elapsed
+        baseline = baseline or elapsed
+        print(f"{name:>10}: {elapsed:.3f}s, {nodes / elapsed:,.0f} nodes/s, "
+              f"{baseline / elapsed:.1f}x")
+    print(f"stats: {times['stats on'] / times['bitboards'] - 1:+.0%} "
+          f"time with tictactoe.stats set")
+    stats = ttt.table.stats()
+    print(f"table: {stats['entries']} entries, {stats['hit_rate']:.1%} hits")
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def count_nodes(positions):
+    """
+    Returns the number of calls to max_value and min_value when solving
+    the positions, which both searches make the same.
+    """
+    calls = [0]
+    max_value, min_value = ttt.max_value, ttt.min_value
+
+    # The recursion goes through the module, so it sees the counting versions
+    def counted_max(*args):
+        calls[0] += 1
+        return max_value(*args)
+
+    def counted_min(*args):
+        calls[0] += 1
+        return min_value(*args)
+
+    ttt.max_value, ttt.min_value = counted_max, counted_min
+    try:
+        for board in positions:
+            ttt.min_value(*ttt.encode(board))
+    finally:
+        ttt.max_value, ttt.min_value = max_value, min_value
+    return calls[0]
+
+
+# The search before bitboards, for comparison
+def legacy_player(board):
+    rounds = 0
+    for row in board:
+        for cell in row:
+            if cell != ttt.EMPTY:
+                rounds += 1
+    if rounds % 2 == 0:
+        return ttt.X
+    return ttt.O
+
+
+def legacy_actions(board):
+    actions = []
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == ttt.EMPTY:
+                actions.append((i, j))
+    return actions
+
+
+def legacy_result(board, action):
+    board_copy = copy.deepcopy(board)
+    if board_copy[action[0]][action[1]]:
+        raise Exception("Not a valid move")
+    board_copy[action[0]][action[1]] = legacy_player(board_copy)
+    return board_copy
+
+
+def legacy_terminal(board):
+    if legacy_utility(board):
+        return True
+    for row in board:
+        for cell in row:
+            if cell is ttt.EMPTY:
+                return False
+    return True
+
+
+def legacy_utility(board):
+    players = {"X": 1, "O": -1}
+    for row in board:
+        if row[0]:
+            if row[0] == row[1] and row[1] == row[2]:
+                return players[row[0]]
+    for j in range(3):
+        if board[0][j]:
+            if board[0][j] == board[1][j] and board[1][j] == board[2][j]:
+                return players[board[0][j]]
+    if board[1][1]:
+        if board[0][0] == board[1][1] and board[1][1] == board[2][2]:
+            return players[board[0][0]]
+        if board[0][2] == board[1][1] and board[1][1] == board[2][0]:
+            return players[board[0][2]]
+    return 0
+
+
+def legacy_find_max(board, prev_max=float('inf')):
+    if legacy_terminal(board):
+        return legacy_utility(board)
+    cur_max = float('-inf')
+    for action in legacy_actions(board):
+        if cur_max >= prev_max:
+            return None
+        value = legacy_find_min(legacy_result(board, action), cur_max)
+        if value is not None:
+            cur_max = max(cur_max, value)
+    return cur_max
+
+
+def legacy_find_min(board, prev_min=float('-inf')):
+    if legacy_terminal(board):
+        return legacy_utility(board)
+    cur_min = float('inf')
+    for action in legacy_actions(board):
+        if cur_min <= prev_min:
+            return None
+        value = legacy_find_max(legacy_result(board, action), cur_min)
+        if value is not None:
+            cur_min = min(cur_min, value)
+    return cur_min
+
+
+if __name__ == "__main__":
+    main()
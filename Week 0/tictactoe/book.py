@@ -0,0 +1,162 @@
+"""
+Opening book with the minimax move of every tic-tac-toe position.
+
+There are only 3 ** 9 ways to fill the board, so the book has one byte
+for each of them, the best cell for the player to move, indexed by the
+board read as a base 3 number. Building it solves the whole game once,
+and minimax then answers with a single lookup into the memory-mapped file.
+
+    python book.py build
+    python book.py verify
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+import tictactoe as ttt
+
+MAGIC = b"TTTBOOK\0"
+VERSION = 1
+FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tictactoe.book")
+
+HEADER = struct.Struct("<8sI")
+POSITIONS = 3 ** 9
+
+# Stored for terminal and unreachable positions
+NO_MOVE = 255
+
+# Base 3 index of every 9 bit mask, X counting 1 and O counting 2 per cell
+TERNARY = [sum(3 ** cell for cell in range(9) if mask & (1 << cell))
+           for mask in range(1 << 9)]
+
+
+def index(x, o):
+    """
+    Returns the position of the (x, o) bitmasks in the book.
+    """
+    return TERNARY[x] + 2 * TERNARY[o]
+
+
+class Book():
+    """
+    Best moves read from a book file, mapped on the first lookup
+    so that loading costs nothing until a move is needed.
+    """
+
+    def __init__(self, path=FILENAME):
+        self.path = path
+        self.moves = None
+        self.loaded = False
+
+    def move(self, x, o):
+        """
+        Returns the best cell for the (x, o) bitmasks,
+        or None if there is no book or no move.
+        """
+        if not self.loaded:
+            self.moves = read(self.path)
+            self.loaded = True
+        if self.moves is None:
+            return None
+        cell = self.moves[HEADER.size + index(x, o)]
+        return None if cell == NO_MOVE else cell
+
+
+def positions():
+    """
+    Yields the (x, o) bitmasks of every reachable position
+    that is not over yet.
+    """
+    stack = [(0, 0)]
+    seen = {(0, 0)}
+    while stack:
+        x, o = stack.pop()
+        if ttt.bits_terminal(x, o):
+            continue
+        yield x, o
+        for cell in ttt.EMPTY_CELLS[x | o]:
+            position = ttt.play(x, o, cell)
+            if position not in seen:
+                seen.add(position)
+                stack.append(position)
+
+
+def build():
+    """
+    Returns the book as bytes, the best move of every reachable
+    position found by the same search as minimax.
+    """
+    moves = bytearray([NO_MOVE]) * POSITIONS
+    for x, o in positions():
+        moves[index(x, o)] = ttt.bits_minimax(x, o)
+    return HEADER.pack(MAGIC, VERSION) + bytes(moves)
+
+
+def write(data, path=FILENAME):
+    # Written to a temporary file first, so a reader never sees half a book
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def read(path=FILENAME):
+    """
+    Returns the book file mapped into memory,
+    or None if it is missing or of another version.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(data) != HEADER.size + POSITIONS or HEADER.unpack_from(data) != (MAGIC, VERSION):
+        data.close()
+        return None
+    return data
+
+
+def verify(path=FILENAME):
+    """
+    Returns the number of positions whose book move differs
+    from the move of a live search, and how many were checked.
+    """
+    book = Book(path)
+    checked = 0
+    wrong = 0
+    for x, o in positions():
+        checked += 1
+        if book.move(x, o) != ttt.bits_minimax(x, o):
+            wrong += 1
+    return wrong, checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "verify"])
+    parser.add_argument("--path", default=FILENAME)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "build":
+        data = build()
+        write(data, args.path)
+        print(f"Wrote {len(data)} bytes to {args.path} "
+              f"in {time.perf_counter() - start:.2f}s.")
+        return
+
+    if read(args.path) is None:
+        sys.exit(f"No book at {args.path}, run: python book.py build")
+    wrong, checked = verify(args.path)
+    print(f"Checked {checked} positions against the search "
+          f"in {time.perf_counter() - start:.2f}s, {wrong} differ.")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
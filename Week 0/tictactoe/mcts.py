@@ -0,0 +1,246 @@
+"""
+Monte Carlo tree search (UCT) for m,n,k games.
+
+Instead of searching every move to some depth like minimax, the tree
+grows towards the moves that win most often in random playouts, which
+keeps working on boards far too big for alpha-beta. Playouts run on the
+bitmasks of mnk.Game, checking only the lines through each move for a win.
+The tree is kept between moves, so the part under the moves actually
+played is reused.
+
+    python mcts.py --size 9 9 5 --budget 1
+"""
+import argparse
+import math
+import random
+import time
+
+from mnk import Game
+from tictactoe import X, O
+
+
+class Node():
+    __slots__ = ("move", "player", "parent", "children", "untried",
+                 "visits", "wins")
+
+    def __init__(self, move, player, parent, untried):
+        # The cell played by player to get here from the parent
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        # Playouts won by player, draws counting half
+        self.wins = 0.0
+
+
+class MCTS():
+    """
+    UCT search, stopping after playouts playouts if given,
+    otherwise after budget seconds.
+    """
+
+    def __init__(self, game, budget=1.0, playouts=None, exploration=1.4, seed=None):
+        self.game = game
+        self.budget = budget
+        self.playouts = playouts
+        self.exploration = exploration
+        self.random = random.Random(seed)
+        self.root = None
+        self.position = None
+        # What the last search did
+        self.stats = {}
+
+    def best_move(self, x, o):
+        """
+        Returns the most visited cell for the player to move on the
+        (x, o) bitmasks, or None if the game is over.
+        """
+        game = self.game
+        if game.bits_utility(x, o) or x | o == game.full:
+            return None
+
+        root = self.reuse(x, o)
+        reused = root.visits
+        self.root, self.position = root, (x, o)
+
+        start = time.perf_counter()
+        deadline = start + self.budget
+        playouts = 0
+        while True:
+            # There must be at least one playout to pick a move from
+            if self.playouts is not None:
+                if playouts >= max(1, self.playouts):
+                    break
+            elif playouts & 63 == 1 and time.perf_counter() > deadline:
+                break
+            self.playout(root, x, o)
+            playouts += 1
+
+        elapsed = time.perf_counter() - start
+        best = max(root.children, key=lambda child: child.visits)
+        self.stats = {
+            "playouts": playouts,
+            "seconds": elapsed,
+            "playouts_per_second": playouts / elapsed if elapsed else None,
+            "reused_visits": reused,
+            "visits": best.visits,
+            "win_rate": best.wins / best.visits
+        }
+        return best.move
+
+    def reuse(self, x, o):
+        """
+        Returns the node of the (x, o) position in the tree of the last
+        search, if it is reached from there by moves, or a new root.
+        """
+        game = self.game
+        node = self.root
+        if node is not None:
+            cx, co = self.position
+            while node is not None and (cx, co) != (x, o):
+                # The one new stone of the player who was to move
+                if game.bits_player(cx, co) == X:
+                    new = x & ~cx
+                else:
+                    new = o & ~co
+                if (x & cx) != cx or (o & co) != co or new & (new - 1) or not new:
+                    node = None
+                    break
+                cell = new.bit_length() - 1
+                node = next((child for child in node.children if child.move == cell), None)
+                cx, co = game.play(cx, co, cell)
+
+        if node is None:
+            player = O if game.bits_player(x, o) == X else X
+            return Node(None, player, None, game.empty_cells(x | o))
+        node.parent = None
+        return node
+
+    def playout(self, root, x, o):
+        """
+        Selects a leaf by UCT, expands it by one move, plays randomly
+        to the end of the game and counts the result up the tree.
+        """
+        game = self.game
+        rng = self.random
+        node = root
+
+        # Selection, the (x, o) position follows the nodes down
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            exploration = self.exploration
+            node = max(node.children, key=lambda child: (
+                child.wins / child.visits
+                + exploration * math.sqrt(log_visits / child.visits)))
+            if node.player == X:
+                x |= 1 << node.move
+            else:
+                o |= 1 << node.move
+
+        # Expansion, unless the game is over at this node
+        winner = None
+        if node.move is not None and game.wins(x if node.player == X else o, node.move):
+            winner = node.player
+        elif node.untried:
+            cell = node.untried.pop(rng.randrange(len(node.untried)))
+            player = O if node.player == X else X
+            if player == X:
+                x |= 1 << cell
+            else:
+                o |= 1 << cell
+            won = game.wins(x if player == X else o, cell)
+            child = Node(cell, player, node, [] if won else game.empty_cells(x | o))
+            node.children.append(child)
+            node = child
+            winner = player if won else self.simulate(x, o, player)
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if winner == node.player:
+                node.wins += 1
+            elif winner is None:
+                node.wins += 0.5
+            node = node.parent
+
+    def simulate(self, x, o, last):
+        """
+        Plays random moves after last moved, returning the winner or None.
+        """
+        game = self.game
+        cells = game.empty_cells(x | o)
+        self.random.shuffle(cells)
+        player = last
+        for cell in cells:
+            if player == X:
+                player = O
+                o |= 1 << cell
+                if game.wins(o, cell):
+                    return O
+            else:
+                player = X
+                x |= 1 << cell
+                if game.wins(x, cell):
+                    return X
+        return None
+
+
+# Searches kept between calls to mcts, by game size, for tree reuse
+searches = {}
+
+
+def mcts(board, budget=1.0, playouts=None, k=None):
+    """
+    Returns the action MCTS picks for the current player on a board
+    of any size, with k in a row winning (as many as the board is wide
+    if not given), like tictactoe.minimax.
+    """
+    m, n = len(board), len(board[0])
+    size = (m, n, k or min(m, n))
+    if size not in searches:
+        searches[size] = MCTS(Game(*size))
+    search = searches[size]
+    search.budget, search.playouts = budget, playouts
+
+    cell = search.best_move(*search.game.encode(board))
+    return None if cell is None else divmod(cell, n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, nargs=3, default=[3, 3, 3],
+                        metavar=("M", "N", "K"))
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="seconds per move")
+    parser.add_argument("--playouts", type=int,
+                        help="playouts per move instead of a time budget")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    # One search plays both sides, reusing its tree after every move
+    game = Game(*args.size)
+    search = MCTS(game, args.budget, args.playouts, seed=args.seed)
+    board = game.initial_state()
+    total = elapsed = 0
+    while not game.terminal(board):
+        cell = search.best_move(*game.encode(board))
+        stats = search.stats
+        total += stats["playouts"]
+        elapsed += stats["seconds"]
+        print(f"{game.player(board)} plays {divmod(cell, game.n)}: "
+              f"{stats['playouts']} playouts, {stats['playouts_per_second']:,.0f}/s, "
+              f"{stats['reused_visits']} reused, win rate {stats['win_rate']:.2f}")
+        board = game.result(board, divmod(cell, game.n))
+
+    for row in board:
+        print(" ".join(cell or "." for cell in row))
+    winner = game.winner(board)
+    print(f"Game Over: {winner} wins." if winner else "Game Over: Tie.")
+    print(f"{total} playouts in {elapsed:.2f}s, {total / elapsed:,.0f} playouts/s")
+
+
+if __name__ == "__main__":
+    main()
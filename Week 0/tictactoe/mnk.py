@@ -0,0 +1,341 @@
+"""
+Tic-tac-toe generalized to m,n,k games: m rows, n columns, k in a row wins.
+
+Game has the same functions as tictactoe.py, for any size, over boards of
+X, O and EMPTY lists, and the same bitmask representation inside, one
+Python int per player with cell (i, j) at bit n * i + j. Past 3x3 the
+whole game tree is far too big, so Search is an anytime alpha-beta search:
+iterative deepening within a time budget, killer and history move
+ordering, and a heuristic evaluation where it has to stop.
+
+    python mnk.py --size 4 4 3 --budget 2
+"""
+import argparse
+import math
+import time
+
+from tictactoe import X, O, EMPTY
+
+# Score of a win, less the number of moves it takes, so that faster wins
+# and slower losses are preferred
+WIN = 1_000_000
+
+
+class Game():
+    """
+    The rules of an m,n,k game.
+    """
+
+    def __init__(self, m=3, n=3, k=3):
+        if k > max(m, n):
+            raise ValueError(f"no line of {k} fits on a {m}x{n} board")
+        self.m = m
+        self.n = n
+        self.k = k
+        self.cells = m * n
+        self.full = (1 << self.cells) - 1
+
+        # Every line of k cells as a mask, in the 4 directions
+        self.lines = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        self.lines.append(sum(1 << (n * (i + di * step) + j + dj * step)
+                                              for step in range(k)))
+
+        # A move can only complete the lines through its own cell
+        self.lines_through = [[line for line in self.lines if line & (1 << cell)]
+                              for cell in range(self.cells)]
+
+        # Cells within two steps of each cell, where moves are worth trying
+        self.near = []
+        for cell in range(self.cells):
+            i, j = divmod(cell, n)
+            self.near.append(sum(1 << (n * a + b)
+                                 for a in range(max(0, i - 2), min(m, i + 3))
+                                 for b in range(max(0, j - 2), min(n, j + 3))))
+
+    def initial_state(self):
+        return [[EMPTY] * self.n for _ in range(self.m)]
+
+    def player(self, board):
+        return self.bits_player(*self.encode(board))
+
+    def actions(self, board):
+        x, o = self.encode(board)
+        return [divmod(cell, self.n) for cell in self.empty_cells(x | o)]
+
+    def result(self, board, action):
+        x, o = self.encode(board)
+        i, j = action
+        if not (0 <= i < self.m and 0 <= j < self.n) or (x | o) & (1 << (self.n * i + j)):
+            raise Exception(f"Not a valid move: {action}")
+        return self.decode(*self.play(x, o, self.n * i + j))
+
+    def winner(self, board):
+        winner = self.bits_utility(*self.encode(board))
+        if winner == 1:
+            return X
+        elif winner == -1:
+            return O
+        return None
+
+    def terminal(self, board):
+        x, o = self.encode(board)
+        return self.bits_utility(x, o) != 0 or x | o == self.full
+
+    def utility(self, board):
+        return self.bits_utility(*self.encode(board))
+
+    def minimax(self, board, budget=1.0):
+        """
+        Returns the best action found for the current player
+        within budget seconds.
+        """
+        cell = Search(self, budget).best_move(*self.encode(board))
+        return None if cell is None else divmod(cell, self.n)
+
+    def encode(self, board):
+        x = o = 0
+        bit = 1
+        for row in board:
+            for cell in row:
+                if cell == X:
+                    x |= bit
+                elif cell == O:
+                    o |= bit
+                bit <<= 1
+        return x, o
+
+    def decode(self, x, o):
+        board = self.initial_state()
+        for cell in range(self.cells):
+            i, j = divmod(cell, self.n)
+            if x & (1 << cell):
+                board[i][j] = X
+            elif o & (1 << cell):
+                board[i][j] = O
+        return board
+
+    def bits_player(self, x, o):
+        return X if bin(x).count("1") == bin(o).count("1") else O
+
+    def play(self, x, o, cell):
+        if self.bits_player(x, o) == X:
+            return x | (1 << cell), o
+        return x, o | (1 << cell)
+
+    def empty_cells(self, occupied):
+        return [cell for cell in range(self.cells) if not occupied & (1 << cell)]
+
+    def wins(self, bits, cell):
+        """
+        Returns whether the stones in bits have a line through cell.
+        """
+        for line in self.lines_through[cell]:
+            if bits & line == line:
+                return True
+        return False
+
+    def bits_utility(self, x, o):
+        for line in self.lines:
+            if x & line == line:
+                return 1
+            if o & line == line:
+                return -1
+        return 0
+
+    def evaluate(self, mine, theirs):
+        """
+        Heuristic value of a position for the player owning mine:
+        every line still open to only one player counts for that player,
+        more the more of its cells they already hold.
+        """
+        score = 0
+        for line in self.lines:
+            if mine & line:
+                if not theirs & line:
+                    score += 4 ** bin(mine & line).count("1")
+            elif theirs & line:
+                score -= 4 ** bin(theirs & line).count("1")
+        return score
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Search():
+    """
+    Iterative deepening negamax alpha-beta search within a time budget.
+
+    Each iteration searches one move deeper, trying first the best move of
+    the previous one, then killer moves (moves that caused a cutoff at the
+    same ply elsewhere) and then moves by history score (how often and how
+    deep they caused cutoffs anywhere). When time runs out, the best move
+    of the last finished iteration is played.
+    """
+
+    def __init__(self, game, budget=1.0, max_depth=None, progress=None):
+        self.game = game
+        self.budget = budget
+        self.max_depth = max_depth
+        # Called with (depth, best move, score, nodes) after every iteration
+        self.progress = progress
+        self.nodes = 0
+        self.depth = 0
+        self.score = None
+        self.killers = []
+        self.history = [0] * game.cells
+        self.moves = None
+        self.deadline = None
+        self.stopped = False
+
+    def best_move(self, x, o):
+        """
+        Returns the best cell for the player to move on the (x, o) bitmasks,
+        or None if the game is over.
+        """
+        game = self.game
+        if game.bits_utility(x, o) or x | o == game.full:
+            return None
+        if game.bits_player(x, o) == X:
+            mine, theirs = x, o
+        else:
+            mine, theirs = o, x
+
+        self.deadline = time.perf_counter() + self.budget
+        moves = self.candidates(mine, theirs)
+        best = moves[0]
+        # The root moves in the order of the last iteration, kept for
+        # searches carrying on from this one, like ParallelSearch
+        self.moves = moves
+        remaining = game.cells - bin(x | o).count("1")
+        max_depth = min(remaining, self.max_depth or remaining)
+
+        for depth in range(1, max_depth + 1):
+            if self.stopped:
+                break
+            self.killers = [[None, None] for _ in range(depth + 1)]
+            self.order_root(moves, best)
+            try:
+                score, move = self.root(mine, theirs, moves, depth)
+            except SearchTimeout:
+                break
+            best, self.score, self.depth = move, score, depth
+            if self.progress is not None:
+                self.progress(depth, best, score, self.nodes)
+            # A forced result does not change with more depth
+            if abs(score) >= WIN - game.cells:
+                break
+        return best
+
+    def stop(self):
+        """
+        Makes a running best_move return the best move found so far,
+        from any thread.
+        """
+        self.stopped = True
+
+    def order_root(self, moves, best):
+        # The previous best move first, it is the likeliest to stay best
+        moves.sort(key=lambda cell: (cell != best, -self.history[cell]))
+
+    def root(self, mine, theirs, moves, depth):
+        alpha = -math.inf
+        best = moves[0]
+        for cell in moves:
+            score = -self.negamax(theirs, mine | (1 << cell), cell,
+                                  depth - 1, -math.inf, -alpha, 1)
+            if score > alpha:
+                alpha, best = score, cell
+        return alpha, best
+
+    def negamax(self, mine, theirs, last, depth, alpha, beta, ply):
+        """
+        Returns the value for the player owning mine, to move,
+        after the other player took last.
+        """
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and (
+                self.stopped or time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+
+        game = self.game
+        if game.wins(theirs, last):
+            return -(WIN - ply)
+        if mine | theirs == game.full:
+            return 0
+        if depth == 0:
+            return game.evaluate(mine, theirs)
+
+        killers = self.killers[ply]
+        history = self.history
+        moves = self.candidates(mine, theirs)
+        moves.sort(key=lambda cell: (cell not in killers, -history[cell]))
+
+        for cell in moves:
+            score = -self.negamax(theirs, mine | (1 << cell), cell,
+                                  depth - 1, -beta, -alpha, ply + 1)
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if cell != killers[0]:
+                    killers[1] = killers[0]
+                    killers[0] = cell
+                history[cell] += depth * depth
+                break
+        return alpha
+
+    def candidates(self, mine, theirs):
+        """
+        Returns the empty cells worth trying: all of them on small boards,
+        only those near a stone on big ones.
+        """
+        game = self.game
+        occupied = mine | theirs
+        if game.cells <= 16 or not occupied:
+            return game.empty_cells(occupied)
+        near = 0
+        stones = occupied
+        while stones:
+            cell = (stones & -stones).bit_length() - 1
+            near |= game.near[cell]
+            stones &= stones - 1
+        return game.empty_cells(occupied | (game.full & ~near))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, nargs=3, default=[3, 3, 3],
+                        metavar=("M", "N", "K"))
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="seconds per move")
+    args = parser.parse_args()
+
+    # The engine plays both sides, showing every iteration of its search
+    game = Game(*args.size)
+    board = game.initial_state()
+    while not game.terminal(board):
+        def progress(depth, best, score, nodes):
+            print(f"    depth {depth}: {divmod(best, game.n)}, "
+                  f"score {score}, {nodes} nodes")
+        x, o = game.encode(board)
+        search = Search(game, args.budget, progress=progress)
+        start = time.perf_counter()
+        cell = search.best_move(x, o)
+        print(f"{game.player(board)} plays {divmod(cell, game.n)} after "
+              f"{time.perf_counter() - start:.2f}s")
+        board = game.result(board, divmod(cell, game.n))
+        for row in board:
+            print(" ".join(cell or "." for cell in row))
+
+    winner = game.winner(board)
+    print(f"Game Over: {winner} wins." if winner else "Game Over: Tie.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Parallel root-split search for m,n,k games.
+
+The shallower iterations of the search, and then the first root move of
+the deepest one, run as usual. Once the first move has set alpha (the
+young brothers wait for their eldest), the other root moves are searched
+at the same time by a pool of processes. Whenever a worker finds a better
+score it raises the shared alpha, so that root moves started later are
+searched with a narrower window.
+
+Every root move that could be best is still searched exactly, and ties
+go to the earliest move in the same order the serial search uses, so the
+move played is the one mnk.Search would play at the same depth. With a
+single worker, the deepest iteration is simply the serial one.
+
+    python parallel.py --size 4 4 4 --depth 7 --workers 1 2 4 8
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import time
+
+from mnk import WIN, Game, Search
+from tictactoe import X
+
+# Lower than any score, for the shared alpha before any move is searched
+NO_SCORE = -2 ** 62
+
+# Set in every worker by start_worker
+worker_game = None
+worker_alpha = None
+
+
+class ParallelSearch():
+    """
+    Fixed depth search splitting the root moves across workers processes.
+
+    Use it as a context manager, so that the pool is started once
+    and shut down with it.
+    """
+
+    def __init__(self, game, workers=os.cpu_count()):
+        self.game = game
+        self.workers = workers
+        # The best score so far and the position of its move in the root order
+        self.alpha = multiprocessing.get_context("fork").Array("q", [NO_SCORE, 0])
+        self.pool = None
+        self.nodes = 0
+        self.score = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            # Forked workers inherit the game and the shared alpha
+            self.pool = multiprocessing.get_context("fork").Pool(
+                self.workers, start_worker, (self.game, self.alpha))
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def best_move(self, x, o, depth):
+        """
+        Returns the best cell for the player to move on the (x, o) bitmasks
+        at the given depth, or None if the game is over.
+        """
+        game = self.game
+        self.nodes = 0
+
+        # The iterations before the last give the order of the root moves
+        search = Search(game, math.inf, max_depth=max(1, depth - 1))
+        best = search.best_move(x, o)
+        self.nodes += search.nodes
+        self.score = search.score
+        remaining = game.cells - bin(x | o).count("1")
+        if (best is None or depth <= 1 or depth > remaining
+                or abs(search.score) >= WIN - game.cells):
+            return best
+
+        moves = search.moves
+        search.order_root(moves, best)
+        mine, theirs = (x, o) if game.bits_player(x, o) == X else (o, x)
+
+        if self.pool is None:
+            search.killers = [[None, None] for _ in range(depth + 1)]
+            nodes = search.nodes
+            self.score, best = search.root(mine, theirs, moves, depth)
+            self.nodes += search.nodes - nodes
+            return best
+
+        # The eldest brother alone, for a first alpha
+        tasks = [(i, mine, theirs, cell, depth, search.history)
+                 for i, cell in enumerate(moves)]
+        self.alpha[:] = [NO_SCORE, 0]
+        results = [search_move(*tasks[0], game=game, alpha=self.alpha)]
+        results += self.pool.starmap(search_move, tasks[1:], chunksize=1)
+
+        # Only exact scores count, the first move in order wins ties
+        exact = [(score, -i, cell) for i, cell, score, is_exact, _ in results if is_exact]
+        self.score, _, best = max(exact)
+        self.nodes += sum(nodes for *_, nodes in results)
+        return best
+
+
+def start_worker(game, alpha):
+    global worker_game, worker_alpha
+    worker_game = game
+    worker_alpha = alpha
+
+
+def search_move(i, mine, theirs, cell, depth, history, game=None, alpha=None):
+    """
+    Searches root move cell to depth with the shared alpha as it is now,
+    raising it if the move does better.
+
+    Returns (i, cell, score, whether the score is exact, nodes).
+    """
+    if game is None:
+        game, alpha = worker_game, worker_alpha
+
+    search = Search(game, math.inf)
+    search.history = list(history)
+    search.killers = [[None, None] for _ in range(depth + 1)]
+    search.deadline = math.inf
+
+    # A move tying the best one so far only matters if it comes earlier,
+    # then the window starts one below so that the tie is found exactly
+    with alpha.get_lock():
+        best, first = alpha[:]
+    if best == NO_SCORE:
+        floor = -math.inf
+    else:
+        floor = best if first < i else best - 1
+    score = -search.negamax(theirs, mine | (1 << cell), cell,
+                            depth - 1, -math.inf, -floor, 1)
+
+    with alpha.get_lock():
+        best, first = alpha[:]
+        if score > best or (score == best and i < first):
+            alpha[:] = [score, i]
+    return i, cell, score, score > floor, search.nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, nargs=3, default=[4, 4, 4],
+                        metavar=("M", "N", "K"))
+    parser.add_argument("--depth", type=int, default=7)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    game = Game(*args.size)
+    x, o = 0, 0
+
+    start = time.perf_counter()
+    serial = Search(game, math.inf, max_depth=args.depth)
+    expected = serial.best_move(x, o)
+    baseline = time.perf_counter() - start
+    print(f"{args.size[0]}x{args.size[1]}, {args.size[2]} in a row, "
+          f"depth {args.depth}, {os.cpu_count()} CPUs")
+    print(f"   serial: {baseline:.2f}s, {serial.nodes} nodes, "
+          f"move {divmod(expected, game.n)}")
+
+    for workers in args.workers:
+        with ParallelSearch(game, workers) as search:
+            start = time.perf_counter()
+            move = search.best_move(x, o, args.depth)
+            elapsed = time.perf_counter() - start
+        same = "same move" if move == expected else f"DIFFERENT move {divmod(move, game.n)}"
+        print(f"{workers:>2} workers: {elapsed:.2f}s, {search.nodes} nodes, "
+              f"{baseline / elapsed:.2f}x, {same}")
+
+
+if __name__ == "__main__":
+    main()
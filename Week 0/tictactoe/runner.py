@@ -1,8 +1,24 @@
+import argparse
 import pygame
 import sys
 import time
 
 import tictactoe as ttt
+from background import BackgroundSearch
+from mnk import Game
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--engine", choices=["minimax", "mcts"], default="minimax",
+                    help="how the computer picks its moves")
+parser.add_argument("--budget", type=float, default=1.0,
+                    help="seconds per move, except for 3x3 minimax")
+parser.add_argument("--size", type=int, nargs=3, default=[3, 3, 3],
+                    metavar=("M", "N", "K"), help="rows, columns and how many in a row win")
+args = parser.parse_args()
+
+# The rules of the game, tictactoe.py itself for the usual 3x3 board
+rules = ttt if args.size == [3, 3, 3] else Game(*args.size)
+rows, columns = args.size[0], args.size[1]
 
 pygame.init()
 size = width, height = 600, 400
@@ -12,21 +28,39 @@ black = (0, 0, 0)
 white = (255, 255, 255)
 
 screen = pygame.display.set_mode(size)
+clock = pygame.time.Clock()
 
+# Tiles shrink to fit bigger boards between the title and the buttons
+tile_size = min(80, (height - 160) // rows, (width - 40) // columns)
+
+smallFont = pygame.font.Font("OpenSans-Regular.ttf", 18)
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
+board = rules.initial_state()
 ai_turn = False
 
+# The computer thinks in the background, so the window keeps drawing
+ai = BackgroundSearch(rules, args.engine, args.budget)
+
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             sys.exit()
 
+        # Space plays the computer's best move so far, Escape gives up the game
+        if event.type == pygame.KEYDOWN and ai_turn:
+            if event.key == pygame.K_SPACE:
+                ai.force()
+            elif event.key == pygame.K_ESCAPE:
+                ai.cancel()
+                user = None
+                board = rules.initial_state()
+                ai_turn = False
+
     screen.fill(black)
 
     # Let user choose a player.
@@ -67,13 +101,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (columns / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(columns):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -89,12 +122,12 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
-        player = ttt.player(board)
+        game_over = rules.terminal(board)
+        player = rules.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = rules.winner(board)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -108,24 +141,62 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, playing it once the search is done
+        # but not sooner than half a second, unless asked to
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
+            if not ai_turn:
+                ai.start(board)
                 ai_turn = True
+            elif ai.done and (ai.stopped or time.perf_counter() - ai.started >= 0.5):
+                board = rules.result(board, ai.move())
+                ai_turn = False
+
+        # Show how the search is going, with buttons to hurry it or give up
+        if ai_turn:
+            status = f"{ai.nodes} nodes"
+            if ai.depth:
+                status += f", depth {ai.depth}"
+            if ai.best is not None:
+                status += f", best {ai.best}"
+            status = smallFont.render(status, True, white)
+            statusRect = status.get_rect()
+            statusRect.center = ((width / 2), 62)
+            screen.blit(status, statusRect)
+
+            moveNowButton = pygame.Rect(width / 8, height - 65, width / 3, 50)
+            moveNow = mediumFont.render("Move Now", True, black)
+            moveNowRect = moveNow.get_rect()
+            moveNowRect.center = moveNowButton.center
+            pygame.draw.rect(screen, white, moveNowButton)
+            screen.blit(moveNow, moveNowRect)
+
+            cancelButton = pygame.Rect(13 * width / 24, height - 65, width / 3, 50)
+            cancel = mediumFont.render("Cancel", True, black)
+            cancelRect = cancel.get_rect()
+            cancelRect.center = cancelButton.center
+            pygame.draw.rect(screen, white, cancelButton)
+            screen.blit(cancel, cancelRect)
+
+            click, _, _ = pygame.mouse.get_pressed()
+            if click == 1:
+                mouse = pygame.mouse.get_pos()
+                if moveNowButton.collidepoint(mouse):
+                    ai.force()
+                elif cancelButton.collidepoint(mouse):
+                    time.sleep(0.2)
+                    ai.cancel()
+                    user = None
+                    board = rules.initial_state()
+                    ai_turn = False
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(rows):
+                for j in range(columns):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
-                        board = ttt.result(board, (i, j))
+                        board = rules.result(board, (i, j))
 
         if game_over:
             againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
@@ -140,7 +211,9 @@ while True:
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
                     user = None
-                    board = ttt.initial_state()
+                    board = rules.initial_state()
                     ai_turn = False
 
     pygame.display.flip()
+    # A steady frame rate, leaving the rest of the time to the search
+    clock.tick(30)
@@ -0,0 +1,165 @@
+"""
+What the tic-tac-toe search does, move by move.
+
+Set tictactoe.stats to a SearchStats and every call to minimax counts its
+nodes, the cutoffs of the prev_max and prev_min pruning by depth below the
+position searched, the children searched per expanded node, the hits of
+the transposition table and the time the move took. With tictactoe.stats
+left as None the search only checks for it once per node (python
+benchmark.py times the search with and without it).
+
+SearchStats keeps the hooks of the one in degrees/util.py where they mean
+the same thing: expanded, measure() timing the block it wraps, and
+as_dict(). Minimax is depth-first over a game tree with no neighbors
+function or frontier queue, so counting(), frontier() and the edges and
+frontier_peak counters have nothing to count here, and the two projects
+are separate directories of scripts, so each keeps its own class.
+
+Run on its own, it self-plays games, the first moves of each picked at
+random so that the games differ, and prints the totals:
+
+    python searchstats.py --games 100 --random 2
+    python searchstats.py --no-table --no-book
+"""
+import argparse
+import contextlib
+import random
+import time
+
+import tictactoe as ttt
+
+
+class SearchStats():
+    """
+    Counters of the search, adding up over every move made while set.
+    """
+
+    def __init__(self):
+        # Calls to max_value and min_value
+        self.nodes = 0
+        # Nodes whose moves were searched, the root of every move included
+        self.expanded = 0
+        # Cutoffs by depth below the position of the move
+        self.cutoffs = {}
+        self.table_hits = 0
+        self.table_lookups = 0
+        self.moves = 0
+        self.book_moves = 0
+        self.seconds = 0.0
+        self.times = []
+        # Stones on the board when the current move started
+        self.root = 0
+
+    @contextlib.contextmanager
+    def measure(self, occupied=0):
+        """
+        Counts the block as one move from the position with the occupied
+        cells, timing it and counting the transposition table hits in it.
+        """
+        self.root = bin(occupied).count("1")
+        table = ttt.table
+        hits, misses = (0, 0) if table is None else (table.hits, table.misses)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            self.times.append(elapsed)
+            self.seconds += elapsed
+            self.moves += 1
+            if table is not None:
+                self.table_hits += table.hits - hits
+                self.table_lookups += table.hits - hits + table.misses - misses
+
+    def cutoff(self, occupied):
+        depth = bin(occupied).count("1") - self.root
+        self.cutoffs[depth] = self.cutoffs.get(depth, 0) + 1
+
+    def as_dict(self):
+        seconds = self.seconds
+        return {
+            "moves": self.moves,
+            "book_moves": self.book_moves,
+            "nodes": self.nodes,
+            "nodes_per_move": self.nodes / self.moves if self.moves else None,
+            "expanded": self.expanded,
+            "branching": self.nodes / self.expanded if self.expanded else None,
+            "cutoffs": dict(sorted(self.cutoffs.items())),
+            "cutoff_rate": (sum(self.cutoffs.values()) / self.expanded
+                            if self.expanded else None),
+            "table_hits": self.table_hits,
+            "table_hit_rate": (self.table_hits / self.table_lookups
+                               if self.table_lookups else None),
+            "seconds": seconds,
+            "seconds_per_move": seconds / self.moves if self.moves else None,
+            "max_seconds": max(self.times, default=None),
+            "nodes_per_second": self.nodes / seconds if seconds else None
+        }
+
+
+def self_play(games, opening, rng):
+    """
+    Plays games of minimax against itself after opening random moves,
+    returning how many X won, O won and were tied.
+    """
+    results = {ttt.X: 0, ttt.O: 0, None: 0}
+    for _ in range(games):
+        board = ttt.initial_state()
+        moves = 0
+        while not ttt.terminal(board):
+            if moves < opening:
+                action = rng.choice(sorted(ttt.actions(board)))
+            else:
+                action = ttt.minimax(board)
+            board = ttt.result(board, action)
+            moves += 1
+        results[ttt.winner(board)] += 1
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--random", type=int, default=2,
+                        help="random moves at the start of each game")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--no-table", action="store_true",
+                        help="search without the transposition table")
+    parser.add_argument("--no-book", action="store_true",
+                        help="search every move instead of using the opening book")
+    args = parser.parse_args()
+
+    if args.no_table:
+        ttt.table = None
+    if args.no_book:
+        ttt.book = None
+    ttt.stats = SearchStats()
+    results = self_play(args.games, args.random, random.Random(args.seed))
+    stats = ttt.stats.as_dict()
+    ttt.stats = None
+
+    def rate(value):
+        return "-" if value is None else f"{value:.1%}"
+
+    print(f"{args.games} games: X won {results[ttt.X]}, O won {results[ttt.O]}, "
+          f"{results[None]} tied")
+    if not stats["moves"]:
+        return
+    print(f"{stats['moves']} moves, {stats['book_moves']} from the book")
+    print(f"{stats['nodes']:,} nodes, {stats['nodes_per_move']:,.0f} per move")
+    if stats["expanded"]:
+        print(f"{stats['expanded']:,} expanded, branching factor {stats['branching']:.2f}")
+    print(f"cutoffs: {sum(stats['cutoffs'].values()):,}, "
+          f"{rate(stats['cutoff_rate'])} of expanded nodes")
+    for depth, count in stats["cutoffs"].items():
+        print(f"    depth {depth}: {count:,}")
+    print(f"table: {stats['table_hits']:,} hits, {rate(stats['table_hit_rate'])}")
+    print(f"time: {stats['seconds_per_move'] * 1000:.3f}ms per move, "
+          f"{stats['max_seconds'] * 1000:.3f}ms at most")
+    if stats["nodes_per_second"] and stats["nodes"]:
+        print(f"{stats['nodes_per_second']:,.0f} nodes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,44 @@
 """
 Tic Tac Toe Player
 """
-import copy
 import math
 
+from book import Book
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
 X = "X"
 O = "O"
 EMPTY = None
 
+# Internally a board is two bitmasks, one for the cells of X and one for O,
+# with cell (i, j) at bit 3 * i + j, so that a move is a single or
+# and checking for a line a single lookup
+FULL = (1 << 9) - 1
+
+# Every row, column and diagonal as a mask
+WIN_MASKS = ([0b111 << (3 * i) for i in range(3)]
+             + [0b1001001 << j for j in range(3)]
+             + [0b100010001, 0b001010100])
+
+# Whether the cells of a mask contain a line, for every possible mask
+HAS_LINE = bytes(any(mask & win == win for win in WIN_MASKS)
+                 for mask in range(FULL + 1))
+
+# The empty cells of every possible mask of occupied cells, in row order
+EMPTY_CELLS = [tuple(cell for cell in range(9) if not occupied & (1 << cell))
+               for occupied in range(FULL + 1)]
+
+# Values of positions already searched, shared by every search,
+# None to search without it
+table = TranspositionTable()
+
+# Precomputed moves that minimax answers from when the book file exists
+# (python book.py build), None to always search
+book = Book()
+
+# A searchstats.SearchStats counting the work of every move, None to not count
+stats = None
+
 
 def initial_state():
     """
@@ -22,71 +53,36 @@ def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    # First player is X
-    # So I check how many non-empty cells are there to determine the number of rounds
-    rounds = 0
-    for row in board:
-        for cell in row:
-            if cell != EMPTY:
-                rounds += 1
-
-    # Even number round, 0, 2, 4... is first player(X)
-    if rounds % 2 == 0:
-        return X
-
-    return O
+    return bits_player(*encode(board))
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-
-    # Place available actions into a list
-    actions = []
-    for i in range(3):
-        for j in range(3):
-            # If empty, means an available move
-            if board[i][j] == EMPTY:
-                actions.append((i,j))
-    return actions
+    x, o = encode(board)
+    return [divmod(cell, 3) for cell in EMPTY_CELLS[x | o]]
 
 
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    # Do not alter the original board
-    # So I create a copy of it and return with the move
-    board_copy = copy.deepcopy(board)
+    # Check if it's a valid move, within the board and on an empty cell
+    x, o = encode(board)
+    i, j = action
+    if not (0 <= i < 3 and 0 <= j < 3) or (x | o) & (1 << (3 * i + j)):
+        raise Exception(f"Not a valid move: {action}")
 
-    # Check if it's a valid move
-    # First see if it is within the size
-    try:
-        if board_copy[action[0]][action[1]]:
-            raise Exception("in", board, "\n", action, "is not a valid move")
-
-    except:
-        print(action)
-        raise Exception("Not a valid move")
-
-
-    # Find out which is the current player so that I can place the sign on the board
-    cur_player = player(board_copy)
-    board_copy[action[0]][action[1]] = cur_player
-    return board_copy
+    # The original board is not altered, a new one is made from the masks
+    return decode(*play(x, o, 3 * i + j))
 
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    # Straight forward to find winner
-
-    if not terminal(board):
-        return None
-
-    winner = utility(board)
+    winner = bits_utility(*encode(board))
     if winner == 1:
         return X
 
@@ -101,50 +97,66 @@ def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    # Check if a winner is present, if yes then game ends
-    if utility(board):
-        return True
-
-    # Check if the board still have empty cell
-    for row in board:
-        for cell in row:
-            if cell is EMPTY:
-                return False
-
-    # If all cells are filled
-    return True
+    return bits_terminal(*encode(board))
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    # A dictionary so that I can return the winner easily
-    players = {"X": 1, "O": -1}
+    return bits_utility(*encode(board))
 
-    # Must ensure those are not empty or 'None'
-    # Check for row first
+
+def encode(board):
+    """
+    Returns the (x, o) bitmasks of a board.
+    """
+    x = o = 0
+    bit = 1
     for row in board:
-        if row[0]:
-            if row[0] == row[1] and row[1] == row[2]:
-                    return players[row[0]]
+        for cell in row:
+            if cell == X:
+                x |= bit
+            elif cell == O:
+                o |= bit
+            bit <<= 1
+    return x, o
 
 
-    # Check for each column
-    for j in range(3):
-        if board[0][j]:
-            if board[0][j] == board[1][j] and board[1][j] == board[2][j]:
-                return players[board[0][j]]
+def decode(x, o):
+    """
+    Returns the board of the (x, o) bitmasks.
+    """
+    return [[X if x & (1 << (3 * i + j)) else O if o & (1 << (3 * i + j)) else EMPTY
+             for j in range(3)]
+            for i in range(3)]
+
+
+def bits_player(x, o):
+    # Even number of moves so far, 0, 2, 4... is first player(X)
+    if bin(x | o).count("1") % 2 == 0:
+        return X
+    return O
+
 
-    # Check for diagonal
-    if board[1][1]:
-        if board[0][0] == board[1][1] and board[1][1] == board[2][2]:
-            return players[board[0][0]]
+def play(x, o, cell):
+    """
+    Returns the (x, o) bitmasks after the player to move takes cell.
+    """
+    if bits_player(x, o) == X:
+        return x | (1 << cell), o
+    return x, o | (1 << cell)
 
-        if board[0][2] == board[1][1] and board[1][1] == board[2][0]:
-            return players[board[0][2]]
 
-    # None of them win
+def bits_terminal(x, o):
+    return bool(HAS_LINE[x] or HAS_LINE[o]) or x | o == FULL
+
+
+def bits_utility(x, o):
+    if HAS_LINE[x]:
+        return 1
+    if HAS_LINE[o]:
+        return -1
     return 0
 
 
@@ -153,47 +165,79 @@ def minimax(board):
     Returns the optimal action for the current player on the board.
     """
     # A recursive function, just as told by Brian from lecture video
+    # The board is only converted once, the search runs on the bitmasks
+    x, o = encode(board)
+    if stats is None:
+        cell = best_cell(x, o)
+    else:
+        with stats.measure(x | o):
+            cell = best_cell(x, o)
+    return None if cell is None else divmod(cell, 3)
+
+
+def best_cell(x, o):
+    """
+    Returns the book move on the (x, o) bitmasks if there is one,
+    otherwise the move found by searching.
+    """
+    if book is not None and not bits_terminal(x, o):
+        cell = book.move(x, o)
+        if cell is not None:
+            if stats is not None:
+                stats.book_moves += 1
+            return cell
+    return bits_minimax(x, o)
 
+
+def bits_minimax(x, o):
+    """
+    Returns the optimal cell for the current player on the (x, o) bitmasks.
+    """
     # Checks the current player
-    cur_player = player(board)
+    cur_player = bits_player(x, o)
 
     #Check for available moves
-    available_moves = actions(board)
+    available_moves = EMPTY_CELLS[x | o]
 
+    # No move left
+    if not available_moves or bits_terminal(x, o):
+        return None
     # Base case, that is, when it is last move for X
     if len(available_moves) == 1:
-        return available_moves.pop()
+        return available_moves[0]
     # Best move for empty board
     elif len(available_moves) == 9:
-        return (0, 0)
+        return 0
+    if stats is not None:
+        stats.expanded += 1
 
     # Now execute each find_max and find_min function
     if cur_player == X:
         # Check for minimum values after each step is made
-        cur_max = find_min(result(board, available_moves[0]))
+        cur_max = min_value(x | (1 << available_moves[0]), o)
         cur_move = available_moves[0]
 
-        for action in available_moves[1:]:
-            value = find_min(result(board, action), cur_max)
+        for cell in available_moves[1:]:
+            value = min_value(x | (1 << cell), o, cur_max)
             if value is None:
                 continue
             if value > cur_max:
                 cur_max = value
-                cur_move = action
+                cur_move = cell
 
         return cur_move
 
     # Similarly for O
-    elif cur_player == O:
-        cur_min = find_max(result(board, available_moves[0]))
+    else:
+        cur_min = max_value(x, o | (1 << available_moves[0]))
         cur_move = available_moves[0]
-        for action in available_moves[1:]:
-            value = find_max(result(board, action), cur_min)
+        for cell in available_moves[1:]:
+            value = max_value(x, o | (1 << cell), cur_min)
             if value is None:
                 continue
             if value < cur_min:
                 cur_min = value
-                cur_move = action
+                cur_move = cell
         return cur_move
 
 
@@ -215,36 +259,98 @@ Something like
 
 # Find the maximum value of this step
 def find_max(board, prev_max = float('inf')):
-    # If completed, straight away get the result
-    if terminal(board):
-        return utility(board)
+    return max_value(*encode(board), prev_max)
+
+# Find the minimum at this step
+def find_min(board, prev_min = float('-inf')):
+    return min_value(*encode(board), prev_min)
 
-    cur_max = float('-inf')
-    for action in actions(board):
+
+# find_max and find_min on the bitmasks, where it is always X to move
+# in max_value and O to move in min_value
+def max_value(x, o, prev_max = math.inf):
+    if stats is not None:
+        stats.nodes += 1
+    # If completed, straight away get the result
+    if HAS_LINE[x]:
+        return 1
+    if HAS_LINE[o]:
+        return -1
+    occupied = x | o
+    if occupied == FULL:
+        return 0
+
+    # An exact value is as good as searching, and a lower bound
+    # already at prev_max cuts off like the search would
+    if table is not None:
+        key = table.key(x, o)
+        entry = table.get(key)
+        if entry is not None:
+            if entry[0] == EXACT:
+                return entry[1]
+            if entry[0] == LOWER and entry[1] >= prev_max:
+                return None
+
+    if stats is not None:
+        stats.expanded += 1
+    cur_max = -math.inf
+    for cell in EMPTY_CELLS[occupied]:
         if cur_max >= prev_max:
             # Do not need to consider this action anymore and skip to next
+            # The value is then only known to be at least cur_max
+            if stats is not None:
+                stats.cutoff(occupied)
+            if table is not None:
+                table.put(key, LOWER, cur_max)
             return None
-        value = find_min(result(board, action), cur_max)
+        value = min_value(x | (1 << cell), o, cur_max)
         # Making sure if the next action is necessary to consider or not
-        if value is not None:
-            cur_max = max(cur_max, value)
+        if value is not None and value > cur_max:
+            cur_max = value
 
+    if table is not None:
+        table.put(key, EXACT, cur_max)
     return cur_max
 
-# Find the minimum at this step
-def find_min(board, prev_min = float('-inf')):
-    #Similarly for find_min
-    if terminal(board):
-        return utility(board)
 
-    cur_min = float('inf')
-    for action in actions(board):
+def min_value(x, o, prev_min = -math.inf):
+    #Similarly for min_value
+    if stats is not None:
+        stats.nodes += 1
+    if HAS_LINE[x]:
+        return 1
+    if HAS_LINE[o]:
+        return -1
+    occupied = x | o
+    if occupied == FULL:
+        return 0
+
+    if table is not None:
+        key = table.key(x, o)
+        entry = table.get(key)
+        if entry is not None:
+            if entry[0] == EXACT:
+                return entry[1]
+            if entry[0] == UPPER and entry[1] <= prev_min:
+                return None
+
+    if stats is not None:
+        stats.expanded += 1
+    cur_min = math.inf
+    for cell in EMPTY_CELLS[occupied]:
         if cur_min <= prev_min:
+            if stats is not None:
+                stats.cutoff(occupied)
+            if table is not None:
+                table.put(key, UPPER, cur_min)
             return None
-        value = find_max(result(board, action), cur_min)
+        value = max_value(x, o | (1 << cell), cur_min)
+
+        if value is not None and value < cur_min:
+            cur_min = value
 
-        if value is not None:
-            cur_min = min(cur_min, value)
+    if table is not None:
+        table.put(key, EXACT, cur_min)
     return cur_min
 
 
@@ -0,0 +1,104 @@
+"""
+Transposition table for the tic-tac-toe search.
+
+Positions are stored under a canonical form, the smallest of the 8
+rotations and reflections of the board, so that a position found through
+any move order, or any symmetric position, is only searched once.
+Since the search cuts off, not every value it finds is exact: a cutoff
+in max_value only proves a lower bound, and one in min_value an upper
+bound, so entries are (flag, value) with flag EXACT, LOWER or UPPER.
+"""
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# The 8 symmetries of the board as functions of (i, j)
+SYMMETRIES = [
+    lambda i, j: (i, j),
+    lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j),
+    lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j),
+    lambda i, j: (2 - i, j),
+    lambda i, j: (j, i),
+    lambda i, j: (2 - j, 2 - i)
+]
+
+
+def transform_table(symmetry):
+    """
+    Returns the image of every 9 bit mask under a symmetry.
+    """
+    cells = []
+    for cell in range(9):
+        i, j = symmetry(*divmod(cell, 3))
+        cells.append(3 * i + j)
+    return [sum(1 << cells[cell] for cell in range(9) if mask & (1 << cell))
+            for mask in range(1 << 9)]
+
+
+TRANSFORMS = [transform_table(symmetry) for symmetry in SYMMETRIES]
+
+
+class TranspositionTable():
+    """
+    Bounded map from canonical positions to (flag, value) entries.
+
+    When full, the oldest entry makes room for the new one, and an entry
+    for a position already stored replaces it, being at least as recent.
+    """
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self.entries = {}
+        # Canonical form of every position seen, at most 3 ** 9 of them
+        self.keys = {}
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def key(self, x, o):
+        """
+        Returns the canonical form of the (x, o) bitmasks.
+        """
+        raw = x | (o << 9)
+        key = self.keys.get(raw)
+        if key is None:
+            key = min(transform[x] | (transform[o] << 9) for transform in TRANSFORMS)
+            self.keys[raw] = key
+        return key
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, key, flag, value):
+        if key not in self.entries and len(self.entries) >= self.max_entries:
+            del self.entries[next(iter(self.entries))]
+            self.evictions += 1
+        self.entries[key] = (flag, value)
+        self.stores += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        """
+        Returns the hit and miss counters and how full the table is.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries
+        }
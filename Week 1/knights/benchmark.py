@@ -0,0 +1,95 @@
+"""
+Evaluations per second of the knowledge bases in puzzle.py.
+
+Every knowledge base is evaluated in every model of its symbols, once by
+walking the sentence with Sentence.evaluate on a dict, and once with the
+function Sentence.compile makes of it, on a tuple. Then every puzzle is
+solved, asking model_check about every symbol as puzzle.py does, with the
+recursive model check it used before, kept here as legacy_model_check,
+and with model_check as it is now.
+
+    python benchmark.py --repeat 5
+"""
+import argparse
+import itertools
+import time
+
+import puzzle
+from logic import model_check
+
+PUZZLES = [("Puzzle 0", puzzle.knowledge0), ("Puzzle 1", puzzle.knowledge1),
+           ("Puzzle 2", puzzle.knowledge2), ("Puzzle 3", puzzle.knowledge3)]
+
+SYMBOLS = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+           puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="runs of each measurement, the fastest one is reported")
+    parser.add_argument("--rounds", type=int, default=200,
+                        help="times every model is evaluated in a run")
+    args = parser.parse_args()
+
+    for name, knowledge in PUZZLES:
+        symbols = sorted(knowledge.symbols())
+        models = list(itertools.product((True, False), repeat=len(symbols))) * args.rounds
+        dicts = [dict(zip(symbols, model)) for model in models]
+        function = knowledge.compile(symbols)
+        if [knowledge.evaluate(model) for model in dicts] != [function(model) for model in models]:
+            raise SystemExit(f"{name}: the compiled sentence disagrees")
+
+        tree = min(timed(lambda: [knowledge.evaluate(model) for model in dicts])
+                   for _ in range(args.repeat))
+        compiled = min(timed(lambda: [function(model) for model in models])
+                       for _ in range(args.repeat))
+        print(f"{name}: {len(symbols)} symbols, "
+              f"tree {len(models) / tree:,.0f}/s, "
+              f"compiled {len(models) / compiled:,.0f}/s, {tree / compiled:.1f}x")
+
+    def solve(check):
+        return [[check(knowledge, symbol) for symbol in SYMBOLS] for _, knowledge in PUZZLES]
+
+    if solve(legacy_model_check) != solve(model_check):
+        raise SystemExit("The model checks disagree")
+    legacy = min(timed(lambda: solve(legacy_model_check)) for _ in range(args.repeat))
+    current = min(timed(lambda: solve(model_check)) for _ in range(args.repeat))
+    print(f"All puzzles: recursive model check {legacy * 1000:.2f}ms, "
+          f"compiled {current * 1000:.2f}ms, {legacy / current:.1f}x")
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+# The model check before compiling, for comparison
+def legacy_model_check(knowledge, query):
+
+    def check_all(knowledge, query, symbols, model):
+        if not symbols:
+            if knowledge.evaluate(model):
+                return query.evaluate(model)
+            return True
+        else:
+            remaining = symbols.copy()
+            p = remaining.pop()
+
+            model_true = model.copy()
+            model_true[p] = True
+
+            model_false = model.copy()
+            model_false[p] = False
+
+            return (check_all(knowledge, query, remaining, model_true) and
+                    check_all(knowledge, query, remaining, model_false))
+
+    symbols = set.union(knowledge.symbols(), query.symbols())
+    return check_all(knowledge, query, symbols, dict())
+
+
+if __name__ == "__main__":
+    main()
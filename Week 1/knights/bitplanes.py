@@ -0,0 +1,156 @@
+"""
+Model checking over many models at once, with NumPy.
+
+The models of n symbols are numbered 0 to 2 ** n - 1, symbol i being true
+in the models with bit i set. They are checked in chunks of 2 ** k models,
+where every symbol is a bit-plane: an array of 64 bit words with one bit
+per model of the chunk. The sentences are then evaluated for every model
+of the chunk together, each connective one bitwise operation on the
+planes of its parts, and the checking stops at the first chunk with a
+model where the knowledge is true and the query false. Memory stays
+bounded by the size of a chunk, whatever the number of symbols.
+
+    python bitplanes.py --symbols 24
+"""
+import argparse
+import time
+
+import numpy as np
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Models in a chunk, as a power of 2, 2 ** 20 models are 128KB per plane
+CHUNK_BITS = 20
+
+WORD_BITS = 64
+ONES = np.uint64(2 ** 64 - 1)
+
+# Bits of one word set where symbol i is true, for the symbols that
+# change within a word
+WORD_PATTERNS = [np.uint64(sum(1 << j for j in range(WORD_BITS) if j >> i & 1))
+                 for i in range(6)]
+
+
+def planes(symbols, bits):
+    """
+    Returns the plane of each of the first bits symbols, the same
+    in every chunk of 2 ** bits models.
+    """
+    words = max(1, 2 ** bits // WORD_BITS)
+    index = np.arange(words, dtype=np.uint64)
+    result = {}
+    for i, name in enumerate(symbols[:bits]):
+        if i < 6:
+            result[name] = np.full(words, WORD_PATTERNS[i], dtype=np.uint64)
+        else:
+            # Whole words are true or false
+            result[name] = np.where((index >> np.uint64(i - 6)) & np.uint64(1), ONES,
+                                    np.uint64(0))
+    return result
+
+
+def evaluate(sentence, values, memo):
+    """
+    Returns the plane of sentence, where values has the plane of every symbol.
+    """
+    key = id(sentence)
+    if key in memo:
+        return memo[key]
+    if isinstance(sentence, Symbol):
+        if sentence.name not in values:
+            raise Exception(f"variable {sentence.name} not in model")
+        plane = values[sentence.name]
+    elif isinstance(sentence, Not):
+        plane = ~evaluate(sentence.operand, values, memo)
+    elif isinstance(sentence, And):
+        plane = values[True]
+        for conjunct in sentence.conjuncts:
+            plane = plane & evaluate(conjunct, values, memo)
+    elif isinstance(sentence, Or):
+        plane = values[False]
+        for disjunct in sentence.disjuncts:
+            plane = plane | evaluate(disjunct, values, memo)
+    elif isinstance(sentence, Implication):
+        plane = (~evaluate(sentence.antecedent, values, memo)
+                 | evaluate(sentence.consequent, values, memo))
+    elif isinstance(sentence, Biconditional):
+        plane = ~(evaluate(sentence.left, values, memo)
+                  ^ evaluate(sentence.right, values, memo))
+    else:
+        raise TypeError(f"cannot evaluate {sentence!r}")
+    memo[key] = plane
+    return plane
+
+
+def counter_model(knowledge, query, chunk_bits=CHUNK_BITS):
+    """
+    Returns a model, as a dict, where knowledge is true and query false,
+    or None if knowledge entails query.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    n = len(symbols)
+    bits = min(n, chunk_bits)
+    inside = planes(symbols, bits)
+    words = max(1, 2 ** bits // WORD_BITS)
+    ones = np.full(words, ONES, dtype=np.uint64)
+    zeros = np.zeros(words, dtype=np.uint64)
+
+    # Below 64 models, the bits past the last model are not models
+    valid = ones if bits >= 6 else np.full(words, np.uint64(2 ** (2 ** bits) - 1))
+
+    for chunk in range(2 ** (n - bits)):
+        # The other symbols are the same in the whole chunk, taken
+        # from the bits of its number
+        values = dict(inside)
+        for i, name in enumerate(symbols[bits:]):
+            values[name] = ones if chunk >> i & 1 else zeros
+        values[True], values[False] = ones, zeros
+
+        memo = {}
+        bad = (evaluate(knowledge, values, memo)
+               & ~evaluate(query, values, memo) & valid)
+        found = np.flatnonzero(bad)
+        if len(found):
+            word = int(found[0])
+            value = int(bad[word])
+            model = (chunk << bits) + word * WORD_BITS + (value & -value).bit_length() - 1
+            return {name: bool(model >> i & 1) for i, name in enumerate(symbols)}
+    return None
+
+
+def entails(knowledge, query, chunk_bits=CHUNK_BITS):
+    """Checks if knowledge base entails query, over bit-planes."""
+    return counter_model(knowledge, query, chunk_bits) is None
+
+
+def main():
+    from logic import model_check
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=24)
+    parser.add_argument("--chunk-bits", type=int, default=CHUNK_BITS)
+    args = parser.parse_args()
+
+    # A chain of implications from P0 to the last symbol, entailed,
+    # so that every model has to be checked
+    symbols = [Symbol(f"P{i}") for i in range(args.symbols)]
+    knowledge = And(symbols[0], *[Implication(symbols[i], symbols[i + 1])
+                                  for i in range(len(symbols) - 1)])
+    query = symbols[-1]
+
+    start = time.perf_counter()
+    result = entails(knowledge, query, args.chunk_bits)
+    elapsed = time.perf_counter() - start
+    print(f"bit-planes: {result} in {elapsed:.3f}s, "
+          f"{2 ** args.symbols / elapsed:,.0f} models/s")
+    if args.symbols <= 24:
+        start = time.perf_counter()
+        result = model_check(knowledge, query)
+        elapsed = time.perf_counter() - start
+        print(f" enumerate: {result} in {elapsed:.3f}s, "
+              f"{2 ** args.symbols / elapsed:,.0f} models/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import functools
 import itertools
 
 
@@ -15,6 +16,25 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def code(self, index):
+        """
+        Returns a Python expression of the logical sentence over a tuple
+        of booleans named model, with the position of each symbol in index.
+        """
+        raise Exception("nothing to compile")
+
+    def compile(self, symbols):
+        """
+        Returns a function evaluating the logical sentence on a tuple of
+        booleans, the values of symbols in the same order.
+        """
+        symbols = list(symbols)
+        function = compile_code(self.code({name: i for i, name in enumerate(symbols)}))
+        if function is None:
+            # Too deeply nested for Python to compile, evaluated as a tree
+            return lambda model: self.evaluate(dict(zip(symbols, model)))
+        return function
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -68,6 +88,11 @@ class Symbol(Sentence):
     def symbols(self):
         return {self.name}
 
+    def code(self, index):
+        if self.name not in index:
+            raise Exception(f"variable {self.name} not in model")
+        return f"model[{index[self.name]}]"
+
 
 class Not(Sentence):
     def __init__(self, operand):
@@ -92,6 +117,9 @@ class Not(Sentence):
     def symbols(self):
         return self.operand.symbols()
 
+    def code(self, index):
+        return f"(not {self.operand.code(index)})"
+
 
 class And(Sentence):
     def __init__(self, *conjuncts):
@@ -129,6 +157,11 @@ class And(Sentence):
     def symbols(self):
         return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
 
+    def code(self, index):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(conjunct.code(index) for conjunct in self.conjuncts) + ")"
+
 
 class Or(Sentence):
     def __init__(self, *disjuncts):
@@ -160,6 +193,11 @@ class Or(Sentence):
     def symbols(self):
         return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
 
+    def code(self, index):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(disjunct.code(index) for disjunct in self.disjuncts) + ")"
+
 
 class Implication(Sentence):
     def __init__(self, antecedent, consequent):
@@ -191,6 +229,9 @@ class Implication(Sentence):
     def symbols(self):
         return set.union(self.antecedent.symbols(), self.consequent.symbols())
 
+    def code(self, index):
+        return f"(not {self.antecedent.code(index)} or {self.consequent.code(index)})"
+
 
 class Biconditional(Sentence):
     def __init__(self, left, right):
@@ -224,40 +265,48 @@ class Biconditional(Sentence):
     def symbols(self):
         return set.union(self.left.symbols(), self.right.symbols())
 
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    def code(self, index):
+        # Each side evaluated once, both are booleans
+        return f"({self.left.code(index)} == {self.right.code(index)})"
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_code(code):
+    """
+    Returns the function of a sentence's code, compiled once for every
+    sentence and order of symbols, or None if it cannot be compiled.
+    """
+    try:
+        return eval(compile(f"lambda model: {code}", "<sentence>", "eval"))
+    except (SyntaxError, RecursionError, MemoryError):
+        return None
+
+
+def model_check(knowledge, query, method="enumerate"):
+    """
+    Checks if knowledge base entails query, by enumerating every model,
+    with method "numpy" many models at a time (see bitplanes.py),
+    or, with method "sat", by satisfiability (see sat.py).
+    """
+    # Imported here, both build on the sentences of this module
+    if method == "sat":
+        from sat import entails
+        return entails(knowledge, query)
+    if method == "numpy":
+        from bitplanes import entails
+        return entails(knowledge, query)
+    if method != "enumerate":
+        raise ValueError(f"unknown method {method!r}")
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    # Both compiled to functions of a tuple of values, one per symbol
+    knowledge_true = knowledge.compile(symbols)
+    query_true = query.compile(symbols)
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    # If knowledge base is true in a model, then query must also be true
+    for model in itertools.product((True, False), repeat=len(symbols)):
+        if knowledge_true(model) and not query_true(model):
+            return False
+    return True
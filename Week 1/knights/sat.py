@@ -0,0 +1,313 @@
+"""
+Entailment by satisfiability, for knowledge bases with too many symbols
+to enumerate every model.
+
+The knowledge base entails the query exactly when knowledge ∧ ¬query has
+no model. The sentence is turned into clauses by the Tseitin encoding,
+one new variable per connective equivalent to it, so the clauses grow
+with the size of the sentence and not exponentially like distributing
+Or over And would. The clauses are then decided by a CDCL solver: unit
+propagation over two watched literals per clause, a clause learned from
+every conflict (the first unique implication point) and backjumping to
+the level it becomes unit at, and decisions on the most active variable.
+
+    python sat.py --symbols 200
+"""
+import argparse
+import time
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+class Encoding():
+    """
+    Clauses of sentences, as lists of non-zero ints, v for variable v
+    and -v for its negation, with a variable for every symbol name.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.variables = {}
+        self.count = 0
+        # The literal of every sentence encoded so far, equal sentences
+        # sharing one
+        self.literals = {}
+
+    def variable(self):
+        self.count += 1
+        return self.count
+
+    def assert_sentence(self, sentence):
+        """Adds clauses making sentence true."""
+        # The conjuncts of a top level And can be asserted one by one
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.assert_sentence(conjunct)
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns the literal equivalent to sentence, adding its clauses."""
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.variable()
+            return self.variables[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, And):
+            literal = self.gate([self.literal(conjunct) for conjunct in sentence.conjuncts])
+        elif isinstance(sentence, Or):
+            literal = -self.gate([-self.literal(disjunct) for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            literal = -self.gate([self.literal(sentence.antecedent),
+                                  -self.literal(sentence.consequent)])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            literal = self.variable()
+            self.clauses += [[-literal, -left, right], [-literal, left, -right],
+                             [literal, left, right], [literal, -left, -right]]
+        else:
+            raise TypeError(f"cannot encode {sentence!r}")
+        self.literals[sentence] = literal
+        return literal
+
+    def gate(self, inputs):
+        """Returns a literal equivalent to the conjunction of inputs."""
+        if len(inputs) == 1:
+            return inputs[0]
+        output = self.variable()
+        for literal in inputs:
+            self.clauses.append([-output, literal])
+        self.clauses.append([output] + [-literal for literal in inputs])
+        return output
+
+
+class Solver():
+    """
+    CDCL solver for clauses over variables 1 to count.
+    """
+
+    def __init__(self, count, clauses):
+        self.count = count
+        self.clauses = []
+        # Clauses by the literals they watch, the first two of each clause
+        self.watches = {literal: [] for variable in range(1, count + 1)
+                        for literal in (variable, -variable)}
+        # 1 for true, -1 for false and 0 for unassigned, by variable
+        self.values = [0] * (count + 1)
+        self.levels = [0] * (count + 1)
+        self.reasons = [None] * (count + 1)
+        self.trail = []
+        # Where every decision level starts in the trail
+        self.limits = []
+        self.head = 0
+        self.activity = [0.0] * (count + 1)
+        self.increment = 1.0
+        # Last value of every variable, tried first when deciding it again
+        self.phases = [-1] * (count + 1)
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.unsatisfiable = False
+
+        for clause in clauses:
+            self.add(clause)
+
+    def value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add(self, clause):
+        # Repeated literals go, a clause with both signs of one is always true
+        literals = list(dict.fromkeys(clause))
+        if any(-literal in literals for literal in literals):
+            return
+        if not literals:
+            self.unsatisfiable = True
+        elif len(literals) == 1:
+            if self.value(literals[0]) == -1:
+                self.unsatisfiable = True
+            elif self.value(literals[0]) == 0:
+                self.assign(literals[0], None)
+        else:
+            self.watch(literals)
+
+    def watch(self, clause):
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """Assigns every unit literal, returning a clause in conflict or None."""
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            self.propagations += 1
+            watching = self.watches[false]
+            kept = []
+            for i, clause in enumerate(watching):
+                # The false literal goes second, the other watch first
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                if self.value(clause[0]) == 1:
+                    kept.append(clause)
+                    continue
+
+                # Another literal that is not false takes over the watch
+                for j in range(2, len(clause)):
+                    if self.value(clause[j]) != -1:
+                        clause[1], clause[j] = clause[j], false
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(clause[0]) == -1:
+                        kept += watching[i + 1:]
+                        self.watches[false] = kept
+                        return clause
+                    self.assign(clause[0], clause)
+            self.watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the clause learned from conflict, its literal of the
+        current level first, and the level to jump back to.
+        """
+        level = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            # The latest literal of this level the conflict depends on
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+        # The latest of the other literals is watched second
+        latest = max(range(1, len(learned)), key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[latest] = learned[latest], learned[1]
+        self.increment /= 0.95
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+
+    def backtrack(self, level):
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = 0
+            self.reasons[variable] = None
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = start
+
+    def decide(self):
+        """Returns the unassigned variable with the most activity, or None."""
+        best = None
+        for variable in range(1, self.count + 1):
+            if not self.values[variable] and (
+                    best is None or self.activity[variable] > self.activity[best]):
+                best = variable
+        return best
+
+    def solve(self):
+        """Returns whether the clauses have a model, left in values if so."""
+        if self.unsatisfiable:
+            return False
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.limits:
+                    self.unsatisfiable = True
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.watch(learned)
+                    self.assign(learned[0], learned)
+                continue
+
+            variable = self.decide()
+            if variable is None:
+                return True
+            self.decisions += 1
+            self.limits.append(len(self.trail))
+            self.assign(variable * self.phases[variable], None)
+
+
+def entails(knowledge, query):
+    """Checks if knowledge base entails query, by satisfiability."""
+    encoding = Encoding()
+    encoding.assert_sentence(knowledge)
+    encoding.assert_sentence(Not(query))
+    return not Solver(encoding.count, encoding.clauses).solve()
+
+
+def main():
+    from logic import model_check
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=200)
+    args = parser.parse_args()
+
+    # A chain of implications from P0 to the last symbol,
+    # where only model checking by satisfiability keeps up
+    symbols = [Symbol(f"P{i}") for i in range(args.symbols)]
+    knowledge = And(symbols[0], *[Implication(symbols[i], symbols[i + 1])
+                                  for i in range(len(symbols) - 1)])
+    for method in ["enumerate", "sat"]:
+        if method == "enumerate" and args.symbols > 18:
+            print(f"{method:>9}: skipped, 2^{args.symbols} models")
+            continue
+        start = time.perf_counter()
+        result = model_check(knowledge, symbols[-1], method=method)
+        print(f"{method:>9}: {result} in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()